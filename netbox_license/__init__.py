@@ -14,7 +14,21 @@ class NetboxLicenseConfig(PluginConfig):
     min_version = '4.3.0'
     default_settings = {
         'top_level_menu': True,
+        # Limits for GraphQL queries on the plugin's types (None disables a limit)
+        'graphql_max_cost': 50000,
+        'graphql_max_depth': 10,
+        # The assumed size of a list field without a pagination limit
+        'graphql_default_list_size': 100,
+        # Cost overrides, keyed as "TypeName.field_name"
+        'graphql_field_weights': {},
+        # Seconds the license panels of devices, VMs and clusters are cached (0 disables)
+        'panel_cache_timeout': 0,
+        # Seconds the change feed watermark trails the current time (the longest expected transaction)
+        'change_feed_lag': 60,
     }
+    middleware = [
+        'netbox_license.middleware.GraphQLCostMiddleware',
+    ]
 
     def ready(self):
         super().ready()
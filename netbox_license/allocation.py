@@ -0,0 +1,176 @@
+from collections import defaultdict
+
+from core.choices import ObjectChangeActionChoices
+from dcim.models import Device
+from django.core.exceptions import ValidationError
+from extras.models import CustomField
+from utilities.exceptions import PermissionsViolation
+from virtualization.models import VirtualMachine
+
+from netbox_license.models import License, LicenseAssignment
+from netbox_license.utils.changelog import log_bulk_changes
+
+__all__ = (
+    'AllocationError',
+    'CapacityLedger',
+    'allocate_assignments',
+)
+
+
+class CapacityLedger:
+    """
+    Validates a batch of new assignments against the capacity of their licenses in
+    memory. The licenses are locked and loaded once; every allocation is counted
+    against them, so later assignments of the batch see the earlier ones. Must be
+    used inside a transaction.
+
+    Args:
+        license_ids (iterable): The licenses the batch is expected to touch. They are
+            locked in primary key order, so concurrent batches cannot deadlock.
+    """
+
+    def __init__(self, license_ids=()):
+        self.licenses = {}
+        self._usage = defaultdict(lambda: [0, 0])
+        self._lock(license_ids)
+
+    def _lock(self, license_ids):
+        queryset = (
+            License.objects.select_for_update(of=("self",))
+            .select_related("license_type")
+            .filter(pk__in=set(license_ids))
+            .order_by("pk")
+        )
+        self.licenses.update((license.pk, license) for license in queryset)
+
+    def get(self, license_id):
+        """
+        Returns the locked License with its in-memory usage counters.
+        """
+        if license_id not in self.licenses:
+            self._lock([license_id])
+        return self.licenses[license_id]
+
+    def allocate(self, assignment):
+        """
+        Counts a new assignment against its license. Raises ValidationError if the
+        license cannot take it.
+        """
+        license = self.get(assignment.license_id)
+        assignment.check_capacity(license)
+
+        license.assigned_volume += assignment.volume
+        license.assignment_count += 1
+        usage = self._usage[license.pk]
+        usage[0] += assignment.volume
+        usage[1] += 1
+
+    def create(self, assignments):
+        """
+        Inserts the allocated assignments with a single statement and writes the usage
+        counters of their licenses (one UPDATE per license). Returns the assignments.
+        """
+        assignments = LicenseAssignment.objects.bulk_create(assignments)
+        for license_id, (volume, count) in self._usage.items():
+            License.objects.filter(pk=license_id).adjust_usage(volume, count)
+        self._usage.clear()
+        return assignments
+
+
+class AllocationError(Exception):
+    """
+    Raised by allocate_assignments() in atomic mode with the result of each item.
+    """
+    def __init__(self, results):
+        super().__init__("Invalid assignments")
+        self.results = results
+
+
+def _restrict(queryset, user, action):
+    return queryset.restrict(user, action) if user is not None else queryset
+
+
+def allocate_assignments(items, user=None, atomic=True, request_id=None):
+    """
+    Creates a batch of license assignments. The items are validated together against
+    the capacity of their licenses (see CapacityLedger) and the valid ones are inserted
+    with a single statement. Must be called inside a transaction.
+
+    Args:
+        items (list): Dicts with the ID of a license and of either a device or a
+            virtual_machine, and optionally a volume (default 1) and a description.
+        user (User): The user the assignments are created by; its object permissions apply.
+        atomic (bool): Write nothing unless every item is valid. Otherwise the invalid
+            items are skipped.
+        request_id (UUID): Groups the changelog entries.
+
+    Returns:
+        list: The result of each item: {"status": "created", "id": ...} or
+            {"status": "failed", "errors": {...}}.
+
+    Raises:
+        AllocationError: In atomic mode, if any item is invalid; nothing is written.
+        PermissionsViolation: If the user may not create any of the assignments.
+    """
+    ledger = CapacityLedger(item['license'] for item in items)
+    visible_licenses = set(
+        _restrict(License.objects.filter(pk__in=ledger.licenses), user, 'view').values_list('pk', flat=True)
+    )
+    devices = _restrict(Device.objects.select_related('device_type__manufacturer'), user, 'view').in_bulk(
+        {item['device'] for item in items if item.get('device') is not None}
+    )
+    virtual_machines = _restrict(VirtualMachine.objects.all(), user, 'view').in_bulk(
+        {item['virtual_machine'] for item in items if item.get('virtual_machine') is not None}
+    )
+    custom_field_defaults = {cf.name: cf.default for cf in CustomField.objects.get_for_model(LicenseAssignment)}
+
+    results, assignments = [], []
+    for item in items:
+        errors = {}
+        if item['license'] not in visible_licenses:
+            errors['license'] = [f"License {item['license']} not found."]
+        device_id, virtual_machine_id = item.get('device'), item.get('virtual_machine')
+        if (device_id is None) == (virtual_machine_id is None):
+            errors['non_field_errors'] = ["Assign the license to either a device or a virtual machine."]
+        elif device_id is not None and device_id not in devices:
+            errors['device'] = [f"Device {device_id} not found."]
+        elif virtual_machine_id is not None and virtual_machine_id not in virtual_machines:
+            errors['virtual_machine'] = [f"Virtual machine {virtual_machine_id} not found."]
+
+        if not errors:
+            assignment = LicenseAssignment(
+                license=ledger.get(item['license']),
+                device=devices.get(device_id),
+                virtual_machine=virtual_machines.get(virtual_machine_id),
+                volume=item.get('volume', 1),
+                description=item.get('description') or '',
+                custom_field_data=dict(custom_field_defaults),
+            )
+            try:
+                ledger.allocate(assignment)
+            except ValidationError as e:
+                errors['non_field_errors'] = e.messages
+            else:
+                assignments.append(assignment)
+                results.append({'status': 'created', 'assignment': assignment})
+                continue
+
+        results.append({'status': 'failed', 'errors': errors})
+
+    if atomic and len(assignments) != len(items):
+        for result in results:
+            if result['status'] == 'created':
+                result['status'] = 'skipped'
+                del result['assignment']
+        raise AllocationError(results)
+
+    ledger.create(assignments)
+    pks = [assignment.pk for assignment in assignments]
+    if user is not None and _restrict(LicenseAssignment.objects.filter(pk__in=pks), user, 'add').count() != len(pks):
+        raise PermissionsViolation()
+    log_bulk_changes(assignments, ObjectChangeActionChoices.ACTION_CREATE, user=user, request_id=request_id)
+
+    for result in results:
+        if 'assignment' in result:
+            result['id'] = result.pop('assignment').pk
+    return results
@@ -0,0 +1,112 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from netbox.api.pagination import OptionalLimitOffsetPagination
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+__all__ = (
+    'OptionalKeysetPagination',
+)
+
+
+class OptionalKeysetPagination(OptionalLimitOffsetPagination):
+    """
+    NetBox's limit/offset pagination, plus an opt-in keyset (cursor) mode for walking
+    large tables: ?pagination=keyset. Each page continues after the last row of the
+    previous one (the "cursor" of the next link) instead of skipping `offset` rows,
+    so its cost does not depend on its depth.
+
+    Parameters of the keyset mode:
+        keyset_order: "id" (default) or "last_updated", which orders on
+            (last_updated, id); both are backed by indexes. Objects without a
+            last_updated timestamp are not returned in last_updated order.
+        cursor: Taken from the "next" link.
+        count: "true" to include the total count, which is skipped by default.
+    """
+    keyset_orderings = {
+        'id': ('id',),
+        'last_updated': ('last_updated', 'id'),
+    }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = request.query_params.get('pagination') == 'keyset'
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request) or self.default_limit
+        self.ordering = request.query_params.get('keyset_order', 'id')
+        if self.ordering not in self.keyset_orderings:
+            raise ValidationError({'keyset_order': f"Must be one of: {', '.join(self.keyset_orderings)}"})
+
+        fields = self.keyset_orderings[self.ordering]
+        if 'last_updated' in fields:
+            queryset = queryset.filter(last_updated__isnull=False)
+        self.count = queryset.count() if request.query_params.get('count') == 'true' else None
+
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            queryset = queryset.filter(self.after(fields, self.decode_cursor(cursor)))
+
+        page = list(queryset.order_by(*fields)[:self.limit + 1])
+        self.next_values = None
+        if len(page) > self.limit:
+            page = page[:self.limit]
+            self.next_values = [getattr(page[-1], field) for field in fields]
+        return page
+
+    @staticmethod
+    def after(fields, values):
+        """
+        Returns the condition for the rows sorting after `values`. For (last_updated, id),
+        the leading range condition lets the composite index serve the lookup.
+        """
+        if len(fields) == 1:
+            return Q(**{f'{fields[0]}__gt': values[0]})
+        (field, tiebreaker), (value, tiebreaker_value) = fields, values
+        return Q(**{f'{field}__gte': value}) & (
+            Q(**{f'{field}__gt': value}) | Q(**{f'{tiebreaker}__gt': tiebreaker_value})
+        )
+
+    def encode_cursor(self, values):
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+        return base64.urlsafe_b64encode(json.dumps([self.ordering, values]).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            ordering, values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if ordering != self.ordering or len(values) != len(self.keyset_orderings[ordering]):
+                raise ValueError
+            if ordering == 'last_updated':
+                values[0] = datetime.fromisoformat(values[0])
+            return values
+        except (TypeError, ValueError):
+            raise NotFound("Invalid cursor")
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_values is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, 'cursor', self.encode_cursor(self.next_values))
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        # Keyset pages are walked forward only
+        return None
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data,
+        })
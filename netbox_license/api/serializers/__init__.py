@@ -1 +1,2 @@
-from .licenses import *
\ No newline at end of file
+from .licenses import *
+from .imports import *
\ No newline at end of file
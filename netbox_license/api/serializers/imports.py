@@ -0,0 +1,61 @@
+from rest_framework import serializers
+
+__all__ = (
+    'AllocationRequestSerializer',
+    'ImportRequestSerializer',
+    'LicenseUpsertSerializer',
+)
+
+
+class ImportRequestSerializer(serializers.Serializer):
+    """
+    The CSV data for a background import, either as an uploaded file or as text.
+    """
+    file = serializers.FileField(required=False)
+    data = serializers.CharField(required=False, trim_whitespace=False)
+    dry_run = serializers.BooleanField(default=False)
+    chunk_size = serializers.IntegerField(default=1000, min_value=1, max_value=10000)
+
+    def validate(self, attrs):
+        if bool(attrs.get('file')) == bool(attrs.get('data')):
+            raise serializers.ValidationError("Provide either a CSV file or CSV data.")
+        return attrs
+
+
+class LicenseUpsertSerializer(serializers.Serializer):
+    """
+    A license to create or update, keyed by its license key. Fields which are left
+    out keep their current value.
+    """
+    license_key = serializers.CharField(max_length=255)
+    license_type = serializers.CharField(required=False, help_text="ID or slug of the license type")
+    serial_number = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+    comments = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    purchase_date = serializers.DateField(required=False, allow_null=True)
+    expiry_date = serializers.DateField(required=False, allow_null=True)
+    volume_limit = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+    parent_license = serializers.CharField(
+        required=False, allow_blank=True, allow_null=True, help_text="License key of the parent license"
+    )
+
+
+class AssignmentAllocationSerializer(serializers.Serializer):
+    """
+    An assignment to create: a license and either a device or a virtual machine.
+    """
+    license = serializers.IntegerField(help_text="ID of the license")
+    device = serializers.IntegerField(required=False, allow_null=True, help_text="ID of the device")
+    virtual_machine = serializers.IntegerField(
+        required=False, allow_null=True, help_text="ID of the virtual machine"
+    )
+    volume = serializers.IntegerField(default=1, min_value=1)
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True, allow_null=True)
+
+
+class AllocationRequestSerializer(serializers.Serializer):
+    """
+    A batch of assignments, written all-or-nothing (atomic) or skipping invalid ones.
+    """
+    atomic = serializers.BooleanField(default=True)
+    assignments = AssignmentAllocationSerializer(many=True, allow_empty=False, max_length=10000)
@@ -19,23 +19,35 @@ class LicenseTypeSerializer(NetBoxModelSerializer):
     class Meta:
         model = LicenseType
         fields = '__all__'
+        brief_fields = ('id', 'url', 'display', 'name', 'slug', 'description')
 
 
 class LicenseSerializer(NetBoxModelSerializer):
     license_type = LicenseTypeSerializer(nested=True, required=True)
+    # Read from the LicenseQuerySet annotations when present (see LicenseViewSet)
+    is_parent_license = serializers.BooleanField(read_only=True)
+    is_child_license = serializers.BooleanField(read_only=True)
+    usage_kinds = serializers.ListField(child=serializers.CharField(), read_only=True)
+    remaining_volume = serializers.IntegerField(read_only=True, allow_null=True)
+    days_to_expiry = serializers.IntegerField(read_only=True, allow_null=True)
+    # Computed on save from the expiry date
+    status = serializers.CharField(read_only=True)
+
     class Meta:
         model = License
         fields = '__all__'
+        brief_fields = ('id', 'url', 'display', 'license_key', 'description')
 
 
 class LicenseAssignmentSerializer(NetBoxModelSerializer):
     license = LicenseSerializer(nested=True, required=True)
     device = DeviceSerializer(nested=True, required=False)
-    device_type = DeviceTypeSerializer(nested=True, required=False)
+    device_type = DeviceTypeSerializer(source='device.device_type', nested=True, read_only=True, allow_null=True)
     virtual_machine = VirtualMachineSerializer(nested=True, required=False)
 
     class Meta:
         model = LicenseAssignment
         fields = '__all__'
+        brief_fields = ('id', 'url', 'display', 'license', 'volume', 'description')
 
     
@@ -1,24 +1,392 @@
+import csv
+import hashlib
+import json
+import uuid
+from datetime import timedelta
+
+from core.api.serializers import JobSerializer
+from core.choices import ObjectChangeActionChoices
+from core.models import ObjectChange
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.response import Response
 from netbox.api.viewsets import NetBoxModelViewSet
-from .serializers import LicenseSerializer, LicenseAssignmentSerializer, LicenseTypeSerializer
+from netbox.plugins import get_plugin_config
+from utilities.exceptions import PermissionsViolation
+from .pagination import OptionalKeysetPagination
+from .serializers import AllocationRequestSerializer, ImportRequestSerializer, LicenseUpsertSerializer, LicenseSerializer, LicenseAssignmentSerializer, LicenseTypeSerializer
 from netbox_license.filtersets.licenses import LicenseFilterSet
 from netbox_license.filtersets import licenseassignments, licensetypes
 from netbox_license.filtersets.licenses import LicenseFilterSet
 from .. import models
+from ..allocation import AllocationError, allocate_assignments
+from ..jobs import LicenseImportJob
+from ..upsert import UpsertValidationError, upsert_licenses
+
+
+class BackgroundImportMixin:
+    """
+    Adds an "import" action, which queues a LicenseImportJob for CSV data (a "file"
+    upload or "data" text) and returns the job.
+    """
+
+    @action(
+        detail=False, methods=['post'], url_path='import',
+        parser_classes=[JSONParser, FormParser, MultiPartParser]
+    )
+    def background_import(self, request):
+        model = self.queryset.model
+        if not request.user.has_perm(f'{model._meta.app_label}.add_{model._meta.model_name}'):
+            raise PermissionDenied()
+
+        serializer = ImportRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        content = serializer.validated_data.get('file') or ContentFile(serializer.validated_data['data'].encode())
+        path = default_storage.save(f'netbox_license/imports/{uuid.uuid4()}.csv', content)
+
+        job = LicenseImportJob.enqueue(
+            user=request.user,
+            model=model._meta.model_name,
+            path=path,
+            dry_run=serializer.validated_data['dry_run'],
+            chunk_size=serializer.validated_data['chunk_size'],
+        )
+        return Response(JobSerializer(job, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+
+class Echo:
+    """
+    A file-like object which returns what is written to it, for streaming CSV.
+    """
+    def write(self, value):
+        return value
+
+
+class StreamingExportMixin:
+    """
+    Adds an "export" action which streams all objects matching the list filters as
+    NDJSON or CSV (?export_format=csv). Rows are projected with values_list() and read
+    in chunks, so the memory used does not grow with the number of rows.
+
+    `export_fields` maps each exported column to the field lookup it is read from.
+    """
+    export_fields = {}
+    export_chunk_size = 2000
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            raise ValidationError({'export_format': "Must be 'ndjson' or 'csv'."})
+
+        # Filter the restricted queryset itself, without the prefetches for the serializer
+        queryset = self.filter_queryset(self.queryset)
+        rows = queryset.order_by('pk').values_list(*self.export_fields.values()).iterator(
+            chunk_size=self.export_chunk_size
+        )
+        columns = list(self.export_fields)
+
+        if export_format == 'csv':
+            writer = csv.writer(Echo())
+            content = (writer.writerow(row) for row in self._with_header(columns, rows))
+            content_type = 'text/csv'
+        else:
+            encoder = DjangoJSONEncoder()
+            content = (encoder.encode(dict(zip(columns, row))) + '\n' for row in rows)
+            content_type = 'application/x-ndjson'
+
+        filename = f'{self.queryset.model._meta.verbose_name_plural.lower().replace(" ", "_")}.{export_format}'
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @staticmethod
+    def _with_header(columns, rows):
+        yield columns
+        yield from rows
+
+
+class ChangeFeedMixin:
+    """
+    Adds a "changes" action: the objects created or updated after the `since`
+    timestamp (by their indexed last_updated), and tombstones for the objects deleted
+    since then (from the changelog), along with the watermark to pass as `since` on
+    the next call.
+
+    At most `limit` objects are returned per call ("more" is then true). Objects
+    sharing a timestamp are never split across calls, so no change is skipped.
+
+    last_updated is stamped before the writing transaction commits, so the watermark
+    trails the current time by the change_feed_lag plugin setting (the longest
+    expected transaction, in seconds): changes committed later than that may be missed.
+    Tombstones carry no representation of the deleted object, whose view permission
+    can no longer be checked.
+    """
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        since = parse_datetime(request.query_params.get('since', ''))
+        if since is None:
+            raise ValidationError({'since': "An ISO 8601 timestamp is required."})
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        limit = self.paginator.get_limit(request) or self.paginator.default_limit
+
+        watermark = timezone.now() - timedelta(seconds=get_plugin_config('netbox_license', 'change_feed_lag'))
+        if watermark <= since:
+            return Response({'since': since, 'watermark': since, 'more': False, 'changed': [], 'deleted': []})
+        queryset = self.get_queryset().filter(last_updated__gt=since, last_updated__lte=watermark)
+        changed = list(queryset.order_by('last_updated', 'pk')[:limit + 1])
+        more = len(changed) > limit
+        if more:
+            last = changed[limit - 1].last_updated
+            changed = [obj for obj in changed[:limit] if obj.last_updated < last]
+            if not changed:
+                # The whole page shares one timestamp; return all objects carrying it
+                changed = list(queryset.filter(last_updated=last).order_by('pk'))
+                watermark = last
+            else:
+                watermark = changed[-1].last_updated
+
+        deleted = ObjectChange.objects.filter(
+            changed_object_type=ContentType.objects.get_for_model(self.queryset.model),
+            action=ObjectChangeActionChoices.ACTION_DELETE,
+            time__gt=since,
+            time__lte=watermark,
+        ).order_by('time', 'pk').values('changed_object_id', 'time')
 
-class LicenseViewSet(NetBoxModelViewSet):
+        return Response({
+            'since': since,
+            'watermark': watermark,
+            'more': more,
+            'changed': self.get_serializer(changed, many=True).data,
+            'deleted': [
+                {'id': change['changed_object_id'], 'time': change['time']}
+                for change in deleted
+            ],
+        })
+
+
+class ConditionalListMixin:
+    """
+    Adds an ETag and a Last-Modified header to list responses, and answers a request
+    whose If-None-Match matches the ETag with 304 Not Modified before anything is
+    serialized.
+
+    The ETag is derived from one aggregate query over the filtered queryset: the
+    count plus MAX(last_updated) of the objects and of the related objects their
+    representation depends on (`conditional_fields`), the number of related objects
+    whose mere presence shows in it (`conditional_counts`), combined with the current
+    date (for date-relative fields such as days_to_expiry), the query string, the user
+    and the Accept header. Changes to the usage of a license (assignments) touch its
+    last_updated. Last-Modified is informational only, as deletions do not move it.
+    """
+    conditional_fields = ('last_updated',)
+    conditional_counts = ()
+
+    def get_etag(self, request):
+        queryset = self.filter_queryset(self.queryset).order_by()
+        # Reverse relations may repeat rows; all counts are distinct
+        state = queryset.aggregate(
+            count=Count('pk', distinct=True),
+            **{f'max_{i}': Max(field) for i, field in enumerate(self.conditional_fields)},
+            **{f'count_{i}': Count(field, distinct=True) for i, field in enumerate(self.conditional_counts)}
+        )
+        last_modified = max(
+            (value for key, value in state.items() if key.startswith('max_') and value is not None),
+            default=None
+        )
+        validator = '|'.join(str(value) for value in (
+            *state.values(), timezone.localdate(), request.get_full_path(), request.user.pk,
+            request.headers.get('Accept', '')
+        ))
+        return f'"{hashlib.sha256(validator.encode()).hexdigest()}"', last_modified
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.get_etag(request)
+
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in (tag.strip() for tag in if_none_match.split(',')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+
+class SelectRelatedMixin:
+    """
+    Joins the related objects rendered by the serializer into the list query with
+    select_related(), for the requested fields only (?fields= or ?brief). Nested
+    serializers use their brief fields, so one level of joins covers them.
+
+    `related_fields` maps each serializer field to the relations it reads.
+    """
+    related_fields = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        requested_fields = self.requested_fields
+        relations = {
+            relation
+            for field, field_relations in self.related_fields.items()
+            if requested_fields is None or field in requested_fields
+            for relation in field_relations
+        }
+        if relations:
+            queryset = queryset.select_related(*sorted(relations))
+        return queryset
+
+
+class LicenseViewSet(BackgroundImportMixin, StreamingExportMixin, ChangeFeedMixin, ConditionalListMixin, SelectRelatedMixin, NetBoxModelViewSet):
     """API view for managing Licenses"""
-    queryset = models.License.objects.all()
+    queryset = models.License.objects.with_usage().with_hierarchy().with_kinds()
     serializer_class = LicenseSerializer
     filterset_class = LicenseFilterSet
+    pagination_class = OptionalKeysetPagination
+    # Children show in is_parent_license
+    conditional_fields = (
+        'last_updated', 'license_type__last_updated', 'parent_license__last_updated', 'sub_licenses__last_updated',
+    )
+    conditional_counts = ('sub_licenses',)
+    related_fields = {
+        'license_type': ('license_type',),
+    }
+    export_fields = {
+        'id': 'id',
+        'license_key': 'license_key',
+        'serial_number': 'serial_number',
+        'description': 'description',
+        'license_type_id': 'license_type_id',
+        'license_type': 'license_type__name',
+        'manufacturer': 'license_type__manufacturer__name',
+        'volume_type': 'license_type__volume_type',
+        'volume_limit': 'volume_limit',
+        'assigned_volume': 'assigned_volume',
+        'assignment_count': 'assignment_count',
+        'parent_license': 'parent_license__license_key',
+        'purchase_date': 'purchase_date',
+        'expiry_date': 'expiry_date',
+        'status': 'status',
+        'created': 'created',
+        'last_updated': 'last_updated',
+    }
+
+    def get_queryset(self):
+        # Annotated per request: days_to_expiry is relative to the current date
+        return super().get_queryset().with_expiry()
+
+    @action(detail=False, methods=['post'])
+    def upsert(self, request):
+        """
+        Creates or updates a list of licenses keyed by license_key (see upsert_licenses()).
+        Only licenses which actually change are written.
+        """
+        if not request.user.has_perms(['netbox_license.add_license', 'netbox_license.change_license']):
+            raise PermissionDenied()
+
+        serializer = LicenseUpsertSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            with transaction.atomic():
+                result = upsert_licenses(serializer.validated_data, user=request.user, request_id=request.id)
+        except UpsertValidationError as e:
+            raise ValidationError(e.errors)
+        except PermissionsViolation:
+            raise PermissionDenied()
+
+        return Response(result)
 
-class LicenseAssignmentViewSet(NetBoxModelViewSet):
+class LicenseAssignmentViewSet(BackgroundImportMixin, StreamingExportMixin, ChangeFeedMixin, ConditionalListMixin, SelectRelatedMixin, NetBoxModelViewSet):
     """API viewset for managing LicenseAssignments"""
     queryset = models.LicenseAssignment.objects.all()
     serializer_class = LicenseAssignmentSerializer
     filterset_class = licenseassignments.LicenseAssignmentFilterSet
+    pagination_class = OptionalKeysetPagination
+    conditional_fields = (
+        'last_updated', 'license__last_updated', 'device__last_updated', 'virtual_machine__last_updated',
+    )
+    # Unnamed devices are displayed by their device type
+    related_fields = {
+        'display': ('license', 'device__device_type__manufacturer', 'virtual_machine'),
+        'license': ('license',),
+        'device': ('device__device_type__manufacturer',),
+        'device_type': ('device__device_type__manufacturer',),
+        'virtual_machine': ('virtual_machine',),
+    }
+    export_fields = {
+        'id': 'id',
+        'license_id': 'license_id',
+        'license': 'license__license_key',
+        'device_id': 'device_id',
+        'device': 'device__name',
+        'virtual_machine_id': 'virtual_machine_id',
+        'virtual_machine': 'virtual_machine__name',
+        'volume': 'volume',
+        'assigned_on': 'assigned_on',
+        'description': 'description',
+        'created': 'created',
+        'last_updated': 'last_updated',
+    }
+
+    @action(detail=False, methods=['post'])
+    def allocate(self, request):
+        """
+        POST /api/plugins/license/license-assignments/allocate/
+
+        Creates a batch of assignments, validated together against the capacity of their
+        licenses (see allocate_assignments()). With "atomic" (the default) nothing is
+        written unless every assignment is valid; otherwise invalid ones are skipped.
+        """
+        if not request.user.has_perm('netbox_license.add_licenseassignment'):
+            raise PermissionDenied()
+
+        serializer = AllocationRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            with transaction.atomic():
+                results = allocate_assignments(
+                    serializer.validated_data['assignments'],
+                    user=request.user,
+                    atomic=serializer.validated_data['atomic'],
+                    request_id=request.id,
+                )
+        except AllocationError as e:
+            results, response_status = e.results, status.HTTP_400_BAD_REQUEST
+        except PermissionsViolation:
+            raise PermissionDenied()
+        else:
+            response_status = status.HTTP_200_OK
+
+        return Response({
+            'created': sum(result['status'] == 'created' for result in results),
+            'failed': sum(result['status'] == 'failed' for result in results),
+            'results': results,
+        }, status=response_status)
 
-class LicenseTypeViewSet(NetBoxModelViewSet):
+class LicenseTypeViewSet(ChangeFeedMixin, ConditionalListMixin, SelectRelatedMixin, NetBoxModelViewSet):
     """API viewset for managing License Types"""
     queryset = models.LicenseType.objects.all()
     serializer_class = LicenseTypeSerializer
-    filterset_class = licensetypes.LicenseTypeFilterSet
\ No newline at end of file
+    filterset_class = licensetypes.LicenseTypeFilterSet
+    conditional_fields = ('last_updated', 'manufacturer__last_updated')
+    related_fields = {
+        'manufacturer': ('manufacturer',),
+    }
\ No newline at end of file
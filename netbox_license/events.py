@@ -1,8 +1,70 @@
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import AnonymousUser
 from django.utils.translation import gettext as _
+from extras.events import enqueue_event, flush_events
+from netbox.context import current_request, events_queue
 from netbox.events import EventType, EVENT_TYPE_KIND_WARNING
 
+EXPIRY_STATUS_EVENT = 'netbox_license.expirystatus'
+
 EventType(
-    name='netbox_license.expirystatus',
+    name=EXPIRY_STATUS_EVENT,
     text=_('License Expiry Status'),
     kind=EVENT_TYPE_KIND_WARNING,
-).register()
\ No newline at end of file
+).register()
+
+# Events collected outside of the request cycle (see batched_events())
+_event_batch = ContextVar('netbox_license_event_batch', default=None)
+
+
+@contextmanager
+def batched_events(user=None):
+    """
+    Collects the events raised outside of a request, e.g. by a background job, and
+    flushes them as a single batch when the block exits without an error. Events are
+    keyed per object, so each license is sent once with its last state.
+    """
+    batch = {
+        'queue': {},
+        'user': user or AnonymousUser(),
+        'request_id': uuid.uuid4(),
+    }
+    token = _event_batch.set(batch)
+    try:
+        yield batch['queue']
+    finally:
+        _event_batch.reset(token)
+
+    if batch['queue']:
+        flush_events(list(batch['queue'].values()))
+
+
+def enqueue_object_event(instance, event_type):
+    """
+    Enqueues an event for an object on the current request's event queue or,
+    outside of a request, on the active batch. Returns False if neither is
+    available.
+    """
+    request = current_request.get()
+    if request is not None:
+        queue = events_queue.get()
+        enqueue_event(queue, instance, request.user, request.id, event_type)
+        events_queue.set(queue)
+        return True
+
+    batch = _event_batch.get()
+    if batch is not None:
+        enqueue_event(batch['queue'], instance, batch['user'], batch['request_id'], event_type)
+        return True
+
+    return False
+
+
+def enqueue_expiry_event(instance):
+    """
+    Enqueues the expiry status event for a license (see enqueue_object_event()).
+    """
+    return enqueue_object_event(instance, EXPIRY_STATUS_EVENT)
@@ -1,6 +1,8 @@
 import django_filters
 from django.utils.translation import gettext as _
+from django.contrib.postgres.search import TrigramSimilarity
 from django.db.models import Q
+from django.db.models.functions import Greatest
 from netbox_license.models.license import License
 from netbox_license.models.licenseassignment import LicenseAssignment
 from netbox_license.models.licensetype import LicenseType
@@ -101,14 +103,20 @@ class LicenseAssignmentFilterSet(NetBoxModelFilterSet):
    
 
     def search(self, queryset, name, value):
+        # Each related lookup is a semijoin on its own table; the license match is
+        # served by the trigram indexes (see LicenseQuerySet.search)
         return queryset.filter(
-            Q(license__license_key__icontains=value)
-            | Q(license__serial_number__icontains=value)
-            | Q(license__description__icontains=value)
-            | Q(license__license_type__manufacturer__name__icontains=value)
-            | Q(device__name__icontains=value)
-            | Q(virtual_machine__name__icontains=value)
-        ).distinct()
+            Q(license__in=License.objects.search(value))
+            | Q(device__in=Device.objects.filter(name__icontains=value))
+            | Q(virtual_machine__in=VirtualMachine.objects.filter(name__icontains=value))
+        ).annotate(
+            search_rank=Greatest(
+                TrigramSimilarity('license__license_key', value),
+                TrigramSimilarity('license__serial_number', value),
+                TrigramSimilarity('device__name', value),
+                TrigramSimilarity('virtual_machine__name', value),
+            )
+        ).order_by('-search_rank', 'pk')
     
     def filter_kind(self, queryset, name, value):
         q = Q()
@@ -1,7 +1,8 @@
 import django_filters
 from django.utils.translation import gettext as _
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from netbox_license.models.license import License
+from netbox_license.models.licenseassignment import LicenseAssignment
 from netbox_license.models.licensetype import LicenseType
 from netbox_license.choices import VolumeTypeChoices, LicenseModelChoices
 from netbox.filtersets import NetBoxModelFilterSet
@@ -53,6 +54,11 @@ class LicenseFilterSet(NetBoxModelFilterSet):
         queryset=License.objects.filter(parent_license__isnull=True),
         label="Parent License"
     )
+    parent_license_id = django_filters.ModelMultipleChoiceFilter(
+        field_name='parent_license',
+        queryset=License.objects.all(),
+        label="Parent License (ID)"
+    )
     parent_license_type = django_filters.ModelMultipleChoiceFilter(
         field_name='parent_license__license_type',
         queryset=LicenseType.objects.all(),
@@ -60,7 +66,7 @@ class LicenseFilterSet(NetBoxModelFilterSet):
     )
 
     child_license = django_filters.ModelMultipleChoiceFilter(
-        field_name='sub_licenses',
+        method='filter_child_license',
         queryset=License.objects.exclude(parent_license__isnull=True),
         label="Child Licenses"
     )
@@ -82,23 +88,47 @@ class LicenseFilterSet(NetBoxModelFilterSet):
         label='Is Assigned',
     )
     
+    # The assignments__* filters receive their field_name (a LicenseAssignment relation)
+    # as `name`. NetBox does not generate lookup variants for method filters, so the
+    # negations (__n) are declared here.
     assignments__device_id = django_filters.ModelMultipleChoiceFilter(
-        field_name='assignments__device',
+        method='filter_assignments',
+        field_name='device',
         queryset=Device.objects.all(),
         label='Assigned to Device (ID)',
     )
+    assignments__device_id__n = django_filters.ModelMultipleChoiceFilter(
+        method='exclude_assignments',
+        field_name='device',
+        queryset=Device.objects.all(),
+        label='Not assigned to Device (ID)',
+    )
 
     assignments__virtual_machine_id = django_filters.ModelMultipleChoiceFilter(
-        field_name='assignments__virtual_machine',
+        method='filter_assignments',
+        field_name='virtual_machine',
         queryset=VirtualMachine.objects.all(),
         label='Assigned to VM (ID)',
     )
+    assignments__virtual_machine_id__n = django_filters.ModelMultipleChoiceFilter(
+        method='exclude_assignments',
+        field_name='virtual_machine',
+        queryset=VirtualMachine.objects.all(),
+        label='Not assigned to VM (ID)',
+    )
 
     assignments__virtual_machine__cluster_id = django_filters.ModelMultipleChoiceFilter(
-        field_name='assignments__virtual_machine__cluster',
+        method='filter_assignments',
+        field_name='virtual_machine__cluster',
         queryset=Cluster.objects.all(),
         label='Assigned to Cluster (ID)',
     )
+    assignments__virtual_machine__cluster_id__n = django_filters.ModelMultipleChoiceFilter(
+        method='exclude_assignments',
+        field_name='virtual_machine__cluster',
+        queryset=Cluster.objects.all(),
+        label='Not assigned to Cluster (ID)',
+    )
 
     purchase_date = django_filters.DateFromToRangeFilter(label="Purchase Date (Between)")
     expiry_date = django_filters.DateFromToRangeFilter(label="Expiry Date (Between)")
@@ -108,41 +138,58 @@ class LicenseFilterSet(NetBoxModelFilterSet):
         model = License
         fields = [
             "license_key", "serial_number","license_type__manufacturer", "license_type_id",
-            "volume_type", "license_model", "parent_license", "parent_license_type",
+            "volume_type", "license_model", "parent_license", "parent_license_id", "parent_license_type",
             "child_license", "is_parent_license", "is_child_license",
             "purchase_date", "expiry_date", "is_assigned",
         ]
 
 
+    # Filters across reverse relations are expressed as EXISTS/IN semijoins, so they never
+    # duplicate rows (no DISTINCT needed) and can be combined freely.
+
     def filter_is_parent_license(self, queryset, name, value):
-        if value:
-            return queryset.filter(sub_licenses__isnull=False).distinct()
-        return queryset.filter(sub_licenses__isnull=True)
-    
+        has_children = Exists(License.objects.filter(parent_license=OuterRef('pk')))
+        return queryset.filter(has_children if value else ~has_children)
+
+    # Absent ModelMultipleChoiceFilter params clean to an empty QuerySet, which
+    # django-filter does not treat as empty; the methods below check it themselves.
+
+    def filter_child_license(self, queryset, name, value):
+        if not value:
+            return queryset
+        children = License.objects.filter(pk__in=[child.pk for child in value])
+        return queryset.filter(pk__in=children.values('parent_license'))
+
     def filter_is_assigned(self, queryset, name, value):
+        is_assigned = Exists(LicenseAssignment.objects.filter(license=OuterRef('pk')))
         if value is True:
-            return queryset.filter(assignments__isnull=False).distinct()
+            return queryset.filter(is_assigned)
         if value is False:
-            return queryset.filter(assignments__isnull=True)
+            return queryset.filter(~is_assigned)
         return queryset
 
+    @staticmethod
+    def _has_assignments(name, value):
+        return Exists(LicenseAssignment.objects.filter(license=OuterRef('pk'), **{f'{name}__in': value}))
+
+    def filter_assignments(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(self._has_assignments(name, value))
+
+    def exclude_assignments(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(~self._has_assignments(name, value))
 
     def filter_by_base_license_type(self, queryset, name, value):
-        try:
-            license_type = LicenseType.objects.get(pk=value)
-            if license_type.license_model == "expansion" and license_type.base_license:
-                return queryset.filter(license_type=license_type.base_license)
-        except LicenseType.DoesNotExist:
-            return queryset.none()
-        return queryset.none()
+        base_license_types = LicenseType.objects.filter(
+            pk=value, license_model="expansion"
+        ).values('base_license')
+        return queryset.filter(license_type__in=base_license_types)
 
     def search(self, queryset, name, value):
         if not value.strip():
             return queryset
-        return queryset.filter(
-            Q(license_key__icontains=value) |
-            Q(serial_number__icontains=value) |
-            Q(description__icontains=value) |
-            Q(license_type__manufacturer__name__icontains=value)|
-            Q(license_type__name__icontains=value) 
-        ).distinct()
\ No newline at end of file
+        # Index-backed (trigram) match, best matches first
+        return queryset.search(value).with_search_rank(value).order_by('-search_rank', 'pk')
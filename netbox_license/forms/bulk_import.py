@@ -1,4 +1,5 @@
 from django import forms
+from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
 from netbox_license import models
 from netbox.forms import NetBoxModelImportForm
 from utilities.forms.fields import CSVChoiceField, CSVModelChoiceField
@@ -8,6 +9,7 @@ from django.utils.text import slugify
 from netbox_license.models.license import License
 from netbox_license.models.licenseassignment import LicenseAssignment
 from netbox_license.models.licensetype import LicenseType
+from .lookups import DUPLICATE, CachedCSVModelChoiceField, ImportLookupsMixin, resolve
 from ..choices import (
     VolumeTypeChoices,
     PurchaseModelChoices,
@@ -19,8 +21,8 @@ from ..choices import (
 )
 # ---------- LicenseType ----------
 
-class LicenseTypeImportForm(NetBoxModelImportForm):
-    manufacturer = CSVModelChoiceField(
+class LicenseTypeImportForm(ImportLookupsMixin, NetBoxModelImportForm):
+    manufacturer = CachedCSVModelChoiceField(
         queryset=Manufacturer.objects.all(),
         to_field_name='name',
         required=True,
@@ -50,7 +52,7 @@ class LicenseTypeImportForm(NetBoxModelImportForm):
         required=True,
         help_text='Peripheral or subscription.'
     )
-    base_license = CSVModelChoiceField(
+    base_license = CachedCSVModelChoiceField(
         queryset=LicenseType.objects.filter(license_model=LicenseModelChoices.BASE),
         to_field_name='name',
         required=False,
@@ -135,13 +137,27 @@ class LicenseTypeImportForm(NetBoxModelImportForm):
         name = cleaned_data.get('name')
         if name:
             generated_slug = slugify(name)
-            if LicenseType.objects.filter(slug=generated_slug).exists():
+            existing_slugs = self.lookups.get('slug')
+            if existing_slugs is None:
+                slug_exists = LicenseType.objects.filter(slug=generated_slug).exists()
+            else:
+                slug_exists = generated_slug in existing_slugs
+            if slug_exists:
                 self.add_error('name', f"A License Type with the generated slug '{generated_slug}' already exists.")
             else:
                 self.instance.slug = generated_slug
+                if existing_slugs is not None:
+                    # Taken for the following records of the same import
+                    existing_slugs.add(generated_slug)
 
         return cleaned_data
 
+    @classmethod
+    def preload_lookups(cls, records, user=None):
+        lookups = super().preload_lookups(records, user)
+        slugs = {slugify(record['name']) for record in records if record.get('name')}
+        lookups['slug'] = set(LicenseType.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+        return lookups
 
     def __init__(self, data=None, *args, **kwargs):
         super().__init__(data, *args, **kwargs)
@@ -164,9 +180,9 @@ class LicenseTypeImportForm(NetBoxModelImportForm):
 
 # ---------- License ----------
 
-class LicenseImportForm(NetBoxModelImportForm):
+class LicenseImportForm(ImportLookupsMixin, NetBoxModelImportForm):
     
-    license_type = CSVModelChoiceField(
+    license_type = CachedCSVModelChoiceField(
         queryset=LicenseType.objects.all(),
         to_field_name='name',
         label='License Type',
@@ -203,8 +219,8 @@ class LicenseImportForm(NetBoxModelImportForm):
         help_text='Required if license type is "Volume". Must be 2 or more.'
     )
 
-    parent_license = CSVModelChoiceField(
-        queryset=License.objects.all(),
+    parent_license = CachedCSVModelChoiceField(
+        queryset=License.objects.select_related('license_type'),
         required=False,
         to_field_name='license_key',
         help_text='Parent license key if applicable'
@@ -272,10 +288,10 @@ class LicenseImportForm(NetBoxModelImportForm):
 
 # ---------- Assignments ----------
 
-class LicenseAssignmentImportForm(NetBoxModelImportForm):
+class LicenseAssignmentImportForm(ImportLookupsMixin, NetBoxModelImportForm):
     
-    license = CSVModelChoiceField(
-        queryset=License.objects.all(),
+    license = CachedCSVModelChoiceField(
+        queryset=License.objects.select_related('license_type'),
         to_field_name='license_key',
         label='License',
         help_text='The license key to assign.'
@@ -332,6 +348,20 @@ class LicenseAssignmentImportForm(NetBoxModelImportForm):
             exclude.remove('virtual_machine')
         return exclude
 
+    @classmethod
+    def preload_lookups(cls, records, user=None):
+        lookups = super().preload_lookups(records, user)
+        names = {AssignmentKindChoices.DEVICE: set(), AssignmentKindChoices.VM: set()}
+        for record in records:
+            kind = record.get('model_kind')
+            if kind in names and record.get('model_name'):
+                names[kind].add(record['model_name'])
+        lookups['model_name'] = {
+            AssignmentKindChoices.DEVICE: resolve(Device.objects.all(), 'name', names[AssignmentKindChoices.DEVICE]),
+            AssignmentKindChoices.VM: resolve(VirtualMachine.objects.all(), 'name', names[AssignmentKindChoices.VM]),
+        }
+        return lookups
+
     def clean_model_name(self):
         kind = self.cleaned_data.get("model_kind")
         name = self.cleaned_data.get("model_name")
@@ -339,19 +369,35 @@ class LicenseAssignmentImportForm(NetBoxModelImportForm):
         if not kind or not name:
             raise forms.ValidationError("Both 'model_kind' and 'model_name' are required.")
 
-        try:
-            if kind == AssignmentKindChoices.DEVICE:
-                device = Device.objects.get(name=name)
-                setattr(self.instance, "device", device)
-                setattr(self.instance, "virtual_machine", None)
-            elif kind == AssignmentKindChoices.VM:
-                vm = VirtualMachine.objects.get(name=name)
-                setattr(self.instance, "virtual_machine", vm)
-                setattr(self.instance, "device", None)
-            else:
-                raise forms.ValidationError(f"Invalid kind: {kind}. Must be 'device' or 'virtual_machine'.")
-        except ObjectDoesNotExist:
+        if kind == AssignmentKindChoices.DEVICE:
+            model = Device
+        elif kind == AssignmentKindChoices.VM:
+            model = VirtualMachine
+        else:
+            raise forms.ValidationError(f"Invalid kind: {kind}. Must be 'device' or 'virtual_machine'.")
+
+        lookup = self.lookups.get("model_name", {}).get(kind)
+        if lookup is not None:
+            obj = lookup.get(name)
+        else:
+            try:
+                obj = model.objects.get(name=name)
+            except ObjectDoesNotExist:
+                obj = None
+            except MultipleObjectsReturned:
+                obj = DUPLICATE
+
+        if obj is None:
             raise forms.ValidationError(f"{kind.capitalize()} '{name}' not found.")
+        if obj is DUPLICATE:
+            raise forms.ValidationError(f"{kind.capitalize()} name '{name}' is not unique.")
+
+        if kind == AssignmentKindChoices.DEVICE:
+            setattr(self.instance, "device", obj)
+            setattr(self.instance, "virtual_machine", None)
+        else:
+            setattr(self.instance, "virtual_machine", obj)
+            setattr(self.instance, "device", None)
 
         return name
 
@@ -374,14 +420,16 @@ class LicenseAssignmentImportForm(NetBoxModelImportForm):
         if not license_type:
             raise forms.ValidationError("License must be linked to a License Type.")
 
+        counted_volume, counted_count = self.instance.counted_usage(license)
+
         if license_type.volume_type == "single":
             if volume != 1:
                 raise forms.ValidationError("Single licenses must be assigned with a volume of 1.")
-            if license.assignments.exists():
+            if license.assignment_count - counted_count > 0:
                 raise forms.ValidationError("Single licenses can only have one assignment.")
 
         elif license_type.volume_type == "volume":
-            total_assigned = license.assignments.aggregate(models.Sum("volume"))["volume__sum"] or 0
+            total_assigned = license.assigned_volume - counted_volume
             if (total_assigned + volume) > (license.volume_limit or 0):
                 raise forms.ValidationError(
                     f"Assigned volume exceeds limit ({license.volume_limit}). Already assigned: {total_assigned}."
@@ -389,7 +437,27 @@ class LicenseAssignmentImportForm(NetBoxModelImportForm):
 
         return cleaned_data
 
-
-
-
-
+    def _lookup_license(self, pk):
+        """
+        Returns the License object the import shares for the given license, if loaded.
+        """
+        to_field_name, lookup = self.lookups.get("license", (None, {}))
+        return next((obj for obj in lookup.values() if obj is not DUPLICATE and obj.pk == pk), None)
+
+    def save(self, *args, **kwargs):
+        license = self.instance.license
+        counted_volume, counted_count = self.instance.counted_usage(license)
+        previous_license = None
+        if self.instance.pk and self.instance.get_loaded_value("license_id") != license.pk:
+            previous_license = self._lookup_license(self.instance.get_loaded_value("license_id"))
+            previous_volume = self.instance.get_loaded_value("volume")
+        instance = super().save(*args, **kwargs)
+        # During an import the same License object serves all of its records; keep its
+        # counters in step with the database for the capacity checks of the next ones
+        license.assigned_volume += instance.volume - counted_volume
+        license.assignment_count += 1 - counted_count
+        # An assignment moved to another license frees its usage on the previous one
+        if previous_license is not None:
+            previous_license.assigned_volume -= previous_volume
+            previous_license.assignment_count -= 1
+        return instance
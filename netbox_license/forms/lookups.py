@@ -0,0 +1,108 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django import forms
+from django.utils.translation import gettext as _
+from utilities.forms.fields import CSVModelChoiceField
+
+__all__ = (
+    'DUPLICATE',
+    'CachedCSVModelChoiceField',
+    'ImportLookupsMixin',
+    'import_lookups',
+    'resolve',
+)
+
+# Marks a value which is shared by several objects
+DUPLICATE = object()
+
+# The lookups of the bulk import in progress (see import_lookups())
+_import_lookups = ContextVar('netbox_license_import_lookups', default=None)
+
+
+def resolve(queryset, field_name, values):
+    """
+    Fetches the objects whose `field_name` is one of `values` in a single query.
+
+    Returns:
+        dict: Maps each value found (as a string) to its object, or to DUPLICATE
+            if more than one object carries it.
+    """
+    lookup = {}
+    if not values:
+        return lookup
+    for obj in queryset.filter(**{f'{field_name}__in': values}):
+        key = str(getattr(obj, field_name))
+        lookup[key] = DUPLICATE if key in lookup else obj
+    return lookup
+
+
+@contextmanager
+def import_lookups(lookups):
+    """
+    Makes the given lookups (see ImportLookupsMixin.preload_lookups()) available to
+    all import forms created within the context.
+    """
+    token = _import_lookups.set(lookups)
+    try:
+        yield lookups
+    finally:
+        _import_lookups.reset(token)
+
+
+class CachedCSVModelChoiceField(CSVModelChoiceField):
+    """
+    A CSVModelChoiceField which resolves its values from a map pre-loaded for the
+    whole import. Values missing from the map (e.g. objects created by an earlier
+    record of the same import) are still looked up in the database.
+    """
+    lookup = None
+
+    def to_python(self, value):
+        if self.lookup is None or value in self.empty_values:
+            return super().to_python(value)
+
+        obj = self.lookup.get(str(value))
+        if obj is None:
+            return super().to_python(value)
+        if obj is DUPLICATE:
+            raise forms.ValidationError(
+                _('"{value}" is not a unique value for this field; multiple objects were found').format(value=value)
+            )
+        return obj
+
+
+class ImportLookupsMixin:
+    """
+    Lets a bulk import resolve the objects referenced by all of its records up front,
+    with one query per field instead of one per record. Forms created within
+    import_lookups() use the pre-loaded maps (self.lookups).
+    """
+
+    @classmethod
+    def preload_lookups(cls, records, user=None):
+        """
+        Returns the lookups for the given records: for every CachedCSVModelChoiceField,
+        a (to_field_name, map) tuple. Subclasses may add their own entries.
+        """
+        lookups = {}
+        for name, field in cls.base_fields.items():
+            if not isinstance(field, CachedCSVModelChoiceField) or not field.to_field_name:
+                continue
+            # Same restriction as the one applied to the form fields by the view
+            queryset = field.queryset.restrict(user, 'view') if user else field.queryset
+            values = {record[name] for record in records if record.get(name)}
+            lookups[name] = (field.to_field_name, resolve(queryset, field.to_field_name, values))
+        return lookups
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lookups = _import_lookups.get() or {}
+
+        for name, field in self.fields.items():
+            if not isinstance(field, CachedCSVModelChoiceField) or name not in self.lookups:
+                continue
+            to_field_name, lookup = self.lookups[name]
+            # A CSV header may select another field to match on (e.g. "license.serial_number")
+            if to_field_name == field.to_field_name:
+                field.lookup = lookup
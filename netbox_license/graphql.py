@@ -2,6 +2,7 @@ from typing import Annotated, List
 
 import strawberry
 import strawberry_django
+from strawberry import auto
 
 from netbox.graphql.types import NetBoxObjectType
 from dcim.graphql.types import ManufacturerType, DeviceType
@@ -9,9 +10,54 @@ from virtualization.graphql.types import VirtualMachineType
 
 
 from netbox_license.models import LicenseType, License, LicenseAssignment
+from netbox_license.models.license import LicenseQuerySet
 
 
-### Basic GraphQL setup without filtering options
+# Related objects are loaded by the DjangoOptimizerExtension of NetBox's schema,
+# which turns the selection set of a query into select_related()/prefetch_related()
+# calls, and the filters and pagination arguments are applied to the queryset.
+
+
+# ───── FILTERS  ───────────────────────────────────────────────────
+
+@strawberry_django.filter_type(LicenseType, lookups=True)
+class LicenseTypeFilter:
+    id: auto
+    name: auto
+    slug: auto
+    manufacturer: auto
+    product_code: auto
+    volume_type: auto
+    license_model: auto
+    base_license: auto
+
+
+
+@strawberry_django.filter_type(License, lookups=True)
+class LicenseFilter:
+    id: auto
+    license_key: auto
+    serial_number: auto
+    description: auto
+    license_type: Annotated["LicenseTypeFilter", strawberry.lazy('netbox_license.graphql')] | None
+    parent_license: auto
+    purchase_date: auto
+    expiry_date: auto
+    volume_limit: auto
+    assigned_volume: auto
+    status: auto
+
+
+
+@strawberry_django.filter_type(LicenseAssignment, lookups=True)
+class LicenseAssignmentFilter:
+    id: auto
+    license: Annotated["LicenseFilter", strawberry.lazy('netbox_license.graphql')] | None
+    device: auto
+    virtual_machine: auto
+    volume: auto
+    assigned_on: auto
+
 
 
 # ───── OBJECT TYPES  ──────────────────────────────────────────────
@@ -19,6 +65,8 @@ from netbox_license.models import LicenseType, License, LicenseAssignment
 @strawberry_django.type(
     LicenseType,
     fields='__all__',
+    filters=LicenseTypeFilter,
+    pagination=True,
 )
 class LicenseTypeType(NetBoxObjectType):
     manufacturer: Annotated["ManufacturerType", strawberry.lazy('dcim.graphql.types')]
@@ -28,15 +76,53 @@ class LicenseTypeType(NetBoxObjectType):
 @strawberry_django.type(
     License,
     fields='__all__',
+    filters=LicenseFilter,
+    pagination=True,
 )
 class LicenseType(NetBoxObjectType):
     license_type: Annotated["LicenseTypeType", strawberry.lazy('netbox_license.graphql')]
 
+    # The optimizer adds the annotations (or fields) the computed fields read to the
+    # query of every selection, including nested licenses (e.g. assignment -> license),
+    # which it then prefetches with an annotated queryset
+
+    @strawberry_django.field(annotate={
+        'is_parent_license_value': lambda info: LicenseQuerySet.hierarchy_annotations()['is_parent_license_value'],
+    })
+    def is_parent_license(self) -> bool:
+        return self.is_parent_license
+
+    @strawberry_django.field(only=['parent_license_id'])
+    def is_child_license(self) -> bool:
+        return self.is_child_license
+
+    @strawberry_django.field(annotate={
+        'has_device_assignments': lambda info: LicenseQuerySet.kind_annotations()['has_device_assignments'],
+        'has_vm_assignments': lambda info: LicenseQuerySet.kind_annotations()['has_vm_assignments'],
+    })
+    def usage_kinds(self) -> List[str]:
+        return self.usage_kinds
+
+    @strawberry_django.field(annotate={
+        'remaining_volume_value': lambda info: LicenseQuerySet.usage_annotations()['remaining_volume_value'],
+    })
+    def remaining_volume(self) -> int | None:
+        return self.remaining_volume
+
+    # Evaluated per request, relative to the current date
+    @strawberry_django.field(annotate={
+        'days_to_expiry_value': lambda info: LicenseQuerySet.expiry_annotations()['days_to_expiry_value'],
+    })
+    def days_to_expiry(self) -> int | None:
+        return self.days_to_expiry
+
 
 
 @strawberry_django.type(
     LicenseAssignment,
     fields='__all__',
+    filters=LicenseAssignmentFilter,
+    pagination=True,
 )
 class LicenseAssignmentType(NetBoxObjectType):
     license: Annotated["LicenseType", strawberry.lazy("netbox_license.graphql")]
@@ -50,27 +136,21 @@ class LicenseAssignmentType(NetBoxObjectType):
 
 @strawberry.type
 class LicenseTypeQuery:
-    @strawberry.field
-    def license_type(self, id: int) -> LicenseTypeType:
-        return None
+    license_type: LicenseTypeType = strawberry_django.field()
     license_type_list: List[LicenseTypeType] = strawberry_django.field()
 
 
 
 @strawberry.type
 class LicenseQuery:
-    @strawberry.field
-    def license(self, id: int) -> LicenseType:
-        return None
+    license: LicenseType = strawberry_django.field()
     license_list: List[LicenseType] = strawberry_django.field()
 
 
 
 @strawberry.type
 class LicenseAssignmentQuery:
-    @strawberry.field
-    def license_assignment(self, id: int) -> LicenseAssignmentType:
-        return None
+    license_assignment: LicenseAssignmentType = strawberry_django.field()
     license_assignment_list: List[LicenseAssignmentType] = strawberry_django.field()
 
 
@@ -0,0 +1,342 @@
+import csv
+from contextlib import nullcontext
+from itertools import islice
+
+from core.choices import ObjectChangeActionChoices
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from utilities.exceptions import AbortRequest, PermissionsViolation
+from utilities.forms import restrict_form_fields
+
+from netbox_license.allocation import CapacityLedger
+from netbox_license.events import enqueue_expiry_event
+from netbox_license.forms.bulk_import import LicenseAssignmentImportForm, LicenseImportForm
+from netbox_license.forms.lookups import DUPLICATE, import_lookups
+from netbox_license.utils.changelog import log_bulk_changes
+
+__all__ = (
+    'IMPORTERS',
+    'BulkImporter',
+    'LicenseAssignmentImporter',
+    'LicenseImporter',
+    'read_csv',
+)
+
+# Per-row errors kept in the result; further errors are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+class DryRunRollback(Exception):
+    pass
+
+
+def read_csv(file):
+    """
+    Reads CSV data from a text file one row at a time. As for NetBox's bulk import,
+    a header of the form "field.attr" matches the related object on `attr`.
+
+    Returns:
+        tuple: The headers ({field: to_field_name or None}) and an iterator of
+            (row number, record) tuples.
+    """
+    reader = csv.reader(file)
+    fields, headers = [], {}
+    for header in next(reader, []):
+        field, _, to_field_name = header.strip().partition('.')
+        fields.append(field)
+        headers[field] = to_field_name or None
+
+    def records():
+        for row_number, row in enumerate(reader, start=2):
+            if any(row):
+                yield row_number, dict(zip(fields, (value.strip() for value in row)))
+
+    return headers, records()
+
+
+class BulkImporter:
+    """
+    Imports CSV records with the import form of the model, chunk by chunk. Each chunk
+    is validated and written with bulk_create()/bulk_update() in its own transaction;
+    invalid records are skipped and reported in the result. A dry run imports
+    everything within one transaction which is rolled back at the end.
+
+    Args:
+        user (User): The user the import runs as; its object permissions apply.
+        dry_run (bool): Only validate the records.
+        chunk_size (int): The number of records per chunk.
+        request_id (UUID): Groups the changelog entries.
+    """
+    model_form = None
+
+    def __init__(self, user=None, dry_run=False, chunk_size=1000, request_id=None):
+        self.model = self.model_form._meta.model
+        self.user = user
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.request_id = request_id
+        self.result = {
+            'processed': 0,
+            'created': 0,
+            'updated': 0,
+            'failed': 0,
+            'errors': [],
+        }
+
+    def get_queryset(self, action):
+        queryset = self.model.objects.all()
+        return queryset.restrict(self.user, action) if self.user else queryset
+
+    def check_permissions(self, action, instances):
+        """
+        Enforces the object permissions of the user on written objects, as NetBox's
+        bulk import view does.
+        """
+        if self.get_queryset(action).filter(pk__in=[obj.pk for obj in instances]).count() != len(instances):
+            raise PermissionsViolation()
+
+    def run(self, headers, records, progress=None):
+        """
+        Imports the records returned by read_csv(). `progress` is called with the
+        result after each chunk (in a dry run, within the transaction which is rolled
+        back: what it writes to the database through the default connection is lost).
+        Returns the result.
+        """
+        try:
+            with transaction.atomic() if self.dry_run else nullcontext():
+                while chunk := list(islice(records, self.chunk_size)):
+                    self.import_chunk(headers, chunk)
+                    if progress:
+                        progress(self.result)
+                if self.dry_run:
+                    raise DryRunRollback
+        except DryRunRollback:
+            pass
+        return self.result
+
+    def add_error(self, row, field, message):
+        if len(self.result['errors']) < MAX_REPORTED_ERRORS:
+            self.result['errors'].append({'row': row, 'field': field, 'message': message})
+
+    def import_chunk(self, headers, chunk):
+        self.result['processed'] += len(chunk)
+        try:
+            with transaction.atomic():
+                created, updated, failed = self.write_chunk(headers, chunk)
+        except (AbortRequest, PermissionsViolation) as e:
+            message = e.message
+        except DatabaseError as e:
+            message = str(e)
+        else:
+            self.result['created'] += len(created)
+            self.result['updated'] += len(updated)
+            self.result['failed'] += failed
+            return
+
+        # The chunk was rolled back
+        self.add_error(chunk[0][0], None, f"Rows {chunk[0][0]}-{chunk[-1][0]} were not imported: {message}")
+        self.result['failed'] += len(chunk)
+
+    def write_chunk(self, headers, chunk):
+        records = [record for row, record in chunk]
+        lookups = self.model_form.preload_lookups(records, user=self.user)
+        existing = self.get_existing(chunk)
+        self.prepare_chunk(lookups, existing)
+
+        new_forms, changed_forms, failed = [], [], 0
+        with import_lookups(lookups):
+            for row, record in chunk:
+                model_form = self.validate(row, record, headers, existing)
+                if model_form is None:
+                    failed += 1
+                elif model_form.instance.pk:
+                    changed_forms.append(model_form)
+                else:
+                    new_forms.append(model_form)
+
+        created = self.create([model_form.instance for model_form in new_forms])
+        self.check_permissions('add', created)
+        updated = self.update([model_form.instance for model_form in changed_forms], changed_forms)
+        self.check_permissions('change', updated)
+        for model_form in new_forms + changed_forms:
+            if model_form.cleaned_data.get('tags'):
+                model_form._save_m2m()
+
+        if not self.dry_run:
+            self.log_changes(created, updated)
+
+        return created, updated, failed
+
+    def get_existing(self, chunk):
+        """
+        Loads the objects updated by the chunk (records with an "id") in one query.
+        """
+        ids = set()
+        for row, record in chunk:
+            if record.get('id', '').isdigit():
+                ids.add(int(record['id']))
+        existing = self.get_queryset('change').in_bulk(ids)
+        for instance in existing.values():
+            instance.snapshot()
+        return existing
+
+    def prepare_chunk(self, lookups, existing):
+        """
+        Hook called once per chunk, before its records are validated.
+        """
+        pass
+
+    def validate(self, row, record, headers, existing):
+        """
+        Binds the record to an import form. Returns the valid form, or None after
+        reporting the errors of the record.
+        """
+        record = dict(record)
+        object_id = record.pop('id', None)
+        if object_id:
+            try:
+                instance = existing.get(int(object_id))
+            except ValueError:
+                instance = None
+            if instance is None:
+                self.add_error(row, 'id', f"Object with ID {object_id} does not exist")
+                return None
+        else:
+            instance = self.model()
+
+        model_form = self.model_form(data=record, instance=instance, headers=headers)
+        if self.user:
+            restrict_form_fields(model_form, self.user)
+        if model_form.is_valid():
+            try:
+                self.validate_instance(model_form.instance)
+            except ValidationError as e:
+                model_form.add_error(None, e)
+
+        if model_form.errors:
+            for field, errors in model_form.errors.items():
+                for error in errors:
+                    self.add_error(row, None if field == '__all__' else field, error)
+            return None
+        return model_form
+
+    def validate_instance(self, instance):
+        """
+        Hook for checks across the records of a chunk. Raises ValidationError.
+        """
+        pass
+
+    def create(self, instances):
+        return self.model.objects.bulk_create(instances)
+
+    def get_update_fields(self, model_forms):
+        """
+        Returns the model fields set by any of the given forms.
+        """
+        fields = {'last_updated', 'custom_field_data'}
+        for model_form in model_forms:
+            fields.update(
+                field.name for field in self.model._meta.concrete_fields if field.name in model_form.fields
+            )
+        return fields
+
+    def update(self, instances, model_forms):
+        if instances:
+            self.model.objects.bulk_update(instances, fields=sorted(self.get_update_fields(model_forms)))
+        return instances
+
+    def log_changes(self, created, updated):
+        log_bulk_changes(created, ObjectChangeActionChoices.ACTION_CREATE, user=self.user, request_id=self.request_id)
+        log_bulk_changes(updated, ObjectChangeActionChoices.ACTION_UPDATE, user=self.user, request_id=self.request_id)
+
+
+class LicenseImporter(BulkImporter):
+    """
+    A record may name a license created by an earlier record of the same chunk as its
+    parent_license; the licenses are then created parents first. License keys occurring
+    more than once in a chunk are reported per record.
+    """
+    model_form = LicenseImportForm
+
+    def prepare_chunk(self, lookups, existing):
+        self.staged = {}
+        # The parent_license map used by the forms, unless the CSV matches parents on another field
+        to_field_name, parents = lookups.get('parent_license', (None, None))
+        self.parents = parents if to_field_name == 'license_key' else None
+
+    def validate_instance(self, instance):
+        key = instance.license_key
+        if key in self.staged:
+            raise ValidationError({'license_key': f"Duplicate license key '{key}' in this import."})
+        self.staged[key] = instance
+        if self.parents is not None and key not in self.parents:
+            # Lets the following records of the chunk reference this license as their parent
+            self.parents[key] = instance
+
+    def set_computed_fields(self, instances):
+        # Done by License.save(), which bulk writes bypass
+        for license in instances:
+            license.status = license.compute_status()
+            license.next_status_change = license.compute_next_status_change()
+
+    def create(self, instances):
+        self.set_computed_fields(instances)
+        # One INSERT per level of the hierarchy: a license is written once its parent is
+        created, pending = [], instances
+        while pending:
+            ready = [
+                license for license in pending
+                if license.parent_license is None or license.parent_license.pk is not None
+            ]
+            if not ready:
+                raise AbortRequest("The parent licenses of the chunk form a cycle.")
+            created += super().create(ready)
+            pending = [license for license in pending if license.pk is None]
+        return created
+
+    def get_update_fields(self, model_forms):
+        return super().get_update_fields(model_forms) | {'status', 'next_status_change'}
+
+    def update(self, instances, model_forms):
+        self.set_computed_fields(instances)
+        return super().update(instances, model_forms)
+
+    def log_changes(self, created, updated):
+        super().log_changes(created, updated)
+        for license in updated:
+            if license.has_changed('status'):
+                enqueue_expiry_event(license)
+
+
+class LicenseAssignmentImporter(BulkImporter):
+    """
+    New assignments are validated against an in-memory ledger of their licenses'
+    usage (see CapacityLedger). Updates of existing assignments move usage between
+    licenses and are saved one by one.
+    """
+    model_form = LicenseAssignmentImportForm
+
+    def prepare_chunk(self, lookups, existing):
+        licenses = lookups['license'][1]
+        self.ledger = CapacityLedger(obj.pk for obj in licenses.values() if obj is not DUPLICATE)
+        for key, obj in licenses.items():
+            if obj is not DUPLICATE:
+                licenses[key] = self.ledger.get(obj.pk)
+
+    def validate_instance(self, instance):
+        if not instance.pk:
+            self.ledger.allocate(instance)
+
+    def create(self, instances):
+        return self.ledger.create(instances)
+
+    def update(self, instances, model_forms):
+        for instance in instances:
+            instance.save()
+        return instances
+
+
+IMPORTERS = {
+    'license': LicenseImporter,
+    'licenseassignment': LicenseAssignmentImporter,
+}
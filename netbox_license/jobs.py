@@ -1,15 +1,98 @@
+import io
+import json
+import logging
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
 from netbox.jobs import JobRunner, system_job
-from core.choices import JobIntervalChoices
+from core.choices import JobIntervalChoices, ObjectChangeActionChoices
+from netbox_license.events import batched_events, enqueue_expiry_event
+from netbox_license.importer import IMPORTERS, read_csv
 from netbox_license.models.license import License
+from netbox_license.utils.changelog import record_changes
+
+logger = logging.getLogger('netbox_license')
+
+
+def log_status_changes(changed, user=None):
+    """
+    Writes the changelog entries and enqueues the expiry status events for the result
+    of LicenseQuerySet.refresh_status(). Only the changed rows are loaded. Outside of
+    a request, call this within batched_events() so the events are sent.
+    """
+    if not changed:
+        return
+
+    licenses = list(License.objects.filter(pk__in=changed.keys()).prefetch_related('tags'))
+    for license in licenses:
+        license.snapshot()
+        license._prechange_snapshot['status'] = changed[license.pk][0]
+        enqueue_expiry_event(license)
 
-@system_job(interval=JobIntervalChoices.INTERVAL_DAILY) 
+    record_changes(licenses, ObjectChangeActionChoices.ACTION_UPDATE, user=user)
+
+
+@system_job(interval=JobIntervalChoices.INTERVAL_DAILY)
 class LicenseStatusCheckJob(JobRunner):
     class Meta:
         name = "License Status Checker"
 
     def run(self, *args, **kwargs):
-        for license in License.objects.all():
-            new_status = license.compute_status()
-            if license.status != new_status:
-                license.status = new_status
-                license.save()
+        today = timezone.now().date()
+
+        # All status transitions of this run are dispatched as one batch of events
+        with batched_events(user=self.job.user):
+            # Only licenses whose next status change is due are touched
+            due = License.objects.filter(next_status_change__lte=today)
+            changed = due.refresh_status(today)
+            due.rebuild_status_changes(today)
+
+            logger.info(f"License status check: {len(changed)} license(s) changed status")
+            log_status_changes(changed, user=self.job.user)
+
+
+class LicenseImportJob(JobRunner):
+    """
+    Imports a CSV file of licenses or license assignments in the background (see
+    netbox_license.importer). The file is read in chunks from the default storage
+    and deleted afterwards. Progress and per-row errors are reported in the job's
+    data; a dry run, which imports within a transaction that is rolled back, writes
+    its progress through a database connection of its own.
+    """
+    class Meta:
+        name = "License Import"
+
+    def run(self, model, path, dry_run=False, chunk_size=1000, *args, **kwargs):
+        importer = IMPORTERS[model](user=self.job.user, dry_run=dry_run, chunk_size=chunk_size)
+
+        progress_connection = connections.create_connection(DEFAULT_DB_ALIAS) if dry_run else None
+
+        def report_progress(result, connection=None):
+            self.job.data = {'model': model, 'dry_run': dry_run, **result}
+            if connection is None:
+                self.job.save(update_fields=['data'])
+                return
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {self.job._meta.db_table} SET data = %s::jsonb WHERE id = %s',
+                    [json.dumps(self.job.data, cls=DjangoJSONEncoder), self.job.pk],
+                )
+
+        try:
+            with default_storage.open(path, 'rb') as file, batched_events(user=self.job.user):
+                headers, records = read_csv(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+                result = importer.run(
+                    headers, records, progress=lambda result: report_progress(result, progress_connection)
+                )
+        finally:
+            default_storage.delete(path)
+            if progress_connection is not None:
+                progress_connection.close()
+
+        report_progress(result)
+        logger.info(
+            f"License import ({model}): {result['created']} created, {result['updated']} updated, "
+            f"{result['failed']} failed"
+        )
@@ -0,0 +1,103 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import BooleanField, Case, F, Value, When
+from dcim.models import Manufacturer
+
+from netbox_license.models import License, LicenseType
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the license list query on synthetic data sets. The data is created in a "
+        "transaction which is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+            help="Numbers of licenses to benchmark with"
+        )
+        parser.add_argument('--page-size', type=int, default=50, help="Rows per list page")
+        parser.add_argument('--explain', action='store_true', help="Print the query plans (EXPLAIN ANALYZE)")
+
+    def handle(self, *args, **options):
+        for scale in options['scales']:
+            try:
+                with transaction.atomic():
+                    self.populate(scale)
+                    self.benchmark(scale, options['page_size'], options['explain'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def populate(self, scale, batch_size=10_000):
+        """
+        Creates `scale` licenses: one in ten is a parent license, one in ten a child license.
+        """
+        manufacturer = Manufacturer.objects.create(name=f'Benchmark {scale}', slug=f'benchmark-{scale}')
+        license_type = LicenseType.objects.create(
+            name=f'Benchmark {scale}', slug=f'benchmark-{scale}',
+            manufacturer=manufacturer, volume_type='volume'
+        )
+
+        parent_count = scale // 10
+        parents = License.objects.bulk_create(
+            (License(license_key=f'BENCH-P-{i}', license_type=license_type, volume_limit=10)
+             for i in range(parent_count)),
+            batch_size=batch_size
+        )
+        License.objects.bulk_create(
+            (License(
+                license_key=f'BENCH-{i}', license_type=license_type, volume_limit=10,
+                parent_license=parents[i % parent_count] if i < parent_count else None
+            ) for i in range(scale - parent_count)),
+            batch_size=batch_size
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {License._meta.db_table}')
+
+    def querysets(self):
+        yield 'exists', License.objects.with_usage().with_hierarchy()
+
+        # The previous implementation, for comparison: a join over sub_licenses plus DISTINCT
+        yield 'join+distinct', License.objects.annotate(
+            is_parent_license_value=Case(
+                When(sub_licenses__isnull=False, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            ),
+            is_child_license_value=Case(
+                When(parent_license__isnull=False, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            ),
+            assigned_count_value=F('assigned_volume')
+        ).distinct()
+
+    def benchmark(self, scale, page_size, explain):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{scale} licenses"))
+
+        for name, queryset in self.querysets():
+            page = queryset.order_by('-is_parent_license_value', 'pk')[:page_size]
+
+            start = time.perf_counter()
+            count = queryset.count()
+            count_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            list(page)
+            page_ms = (time.perf_counter() - start) * 1000
+
+            self.stdout.write(
+                f"  {name:<14} count: {count_ms:9.1f} ms ({count} rows)   "
+                f"first page sorted by parent: {page_ms:9.1f} ms"
+            )
+            if explain:
+                self.stdout.write(page.explain(analyze=True))
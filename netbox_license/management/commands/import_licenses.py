@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_license.events import batched_events
+from netbox_license.importer import IMPORTERS, read_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Import licenses or license assignments from a CSV file, in chunks. Runs the same "
+        "pipeline as the background import job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=IMPORTERS.keys(), help="The type of objects to import")
+        parser.add_argument('path', help="Path of the CSV file")
+        parser.add_argument('--dry-run', action='store_true', help="Only validate the records, without writing anything")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Records per chunk (transaction)")
+        parser.add_argument(
+            '--user',
+            help="Username to import as; its object permissions apply and it is recorded in the changelog"
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist.")
+
+        importer = IMPORTERS[options['model']](
+            user=user, dry_run=options['dry_run'], chunk_size=options['chunk_size']
+        )
+
+        def report_progress(result):
+            self.stdout.write(
+                f"{result['processed']} row(s) processed: {result['created']} created, "
+                f"{result['updated']} updated, {result['failed']} failed"
+            )
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as file, batched_events(user=user):
+            headers, records = read_csv(file)
+            result = importer.run(headers, records, progress=report_progress)
+
+        for error in result['errors']:
+            field = f" {error['field']}" if error['field'] else ""
+            self.stderr.write(f"Row {error['row']}{field}: {error['message']}")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("Dry run: nothing was written."))
+        style = self.style.ERROR if result['failed'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Imported {result['created'] + result['updated']} of {result['processed']} row(s)."
+        ))
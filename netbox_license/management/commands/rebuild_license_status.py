@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from netbox_license.events import batched_events
+from netbox_license.jobs import log_status_changes
+from netbox_license.models import License
+
+
+class Command(BaseCommand):
+    help = "Recompute the status and next status change date of every license (e.g. after a restore)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report licenses with an outdated status or next status change, without writing anything"
+        )
+
+    def handle(self, *args, **options):
+        licenses = License.objects.all()
+
+        if options['check']:
+            stale = licenses.stale_status().count()
+            self.stdout.write(f"{stale} license(s) have an outdated status or next status change.")
+            return
+
+        with batched_events():
+            changed = licenses.refresh_status()
+            log_status_changes(changed)
+        corrected = licenses.rebuild_status_changes()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated the status of {len(changed)} license(s) and the next status change of "
+            f"{corrected} license(s)."
+        ))
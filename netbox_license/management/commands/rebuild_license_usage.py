@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from netbox_license.models import License
+
+
+class Command(BaseCommand):
+    help = "Verify and rebuild the usage counters (assigned volume, assignment count) of every license"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report licenses with out-of-sync counters, without writing anything"
+        )
+
+    def handle(self, *args, **options):
+        licenses = License.objects.all()
+
+        if options['check']:
+            stale = licenses.stale_usage().values_list(
+                'license_key', 'assigned_volume', 'actual_volume', 'assignment_count', 'actual_count'
+            )
+            for license_key, assigned_volume, actual_volume, assignment_count, actual_count in stale:
+                self.stdout.write(
+                    f"{license_key}: volume {assigned_volume} (actual {actual_volume}), "
+                    f"assignments {assignment_count} (actual {actual_count})"
+                )
+            self.stdout.write(f"{len(stale)} license(s) have out-of-sync usage counters.")
+            return
+
+        corrected = licenses.rebuild_usage()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the usage counters of {corrected} license(s)."))
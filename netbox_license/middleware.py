@@ -0,0 +1,280 @@
+import json
+
+from django.http import JsonResponse
+from django.urls import reverse
+from graphql import (
+    FieldNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode, IntValueNode, NullValueNode, ObjectValueNode,
+    OperationDefinitionNode, VariableNode, get_named_type, get_nullable_type, is_composite_type, is_list_type,
+    parse,
+)
+from netbox.plugins import get_plugin_config
+
+__all__ = (
+    'GraphQLCostMiddleware',
+    'QueryCost',
+    'UnboundedListError',
+    'estimate_cost',
+)
+
+# The root fields of the plugin's GraphQL schema; only queries selecting them are analyzed
+ROOT_FIELDS = {
+    'license', 'license_list',
+    'license_type', 'license_type_list',
+    'license_assignment', 'license_assignment_list',
+}
+
+
+class UnboundedListError(Exception):
+    """
+    Raised for list fields whose pagination lifts the limit (a negative or null
+    limit), as their cost cannot be estimated.
+    """
+
+
+class QueryCost:
+    """
+    Estimates the cost and depth of a GraphQL operation from its document, without
+    executing it. Each object field costs its weight (1 unless overridden by
+    `weights`, keyed as "TypeName.field_name"; scalars cost 0); the cost of a list
+    field, including everything selected below it, is multiplied by its expected
+    size: the pagination limit of the field if set, otherwise `default_list_size`.
+    List fields with an explicitly negative or null limit are unbounded and raise
+    UnboundedListError.
+    """
+
+    def __init__(self, schema, weights=None, default_list_size=100, variables=None):
+        self.schema = schema
+        self.weights = weights or {}
+        self.default_list_size = default_list_size
+        self.variables = variables or {}
+
+    def analyze(self, document, operation_name=None):
+        """
+        Returns the (cost, depth) of the plugin's root fields selected by the
+        operation, or None if it selects none of them.
+        """
+        operations = [node for node in document.definitions if isinstance(node, OperationDefinitionNode)]
+        if operation_name:
+            operations = [node for node in operations if node.name and node.name.value == operation_name]
+        if len(operations) != 1 or operations[0].operation.value != 'query':
+            return None
+
+        self.fragments = {
+            node.name.value: node for node in document.definitions if not isinstance(node, OperationDefinitionNode)
+        }
+        root_fields = [
+            field for field, type_name in self.collect_fields(operations[0].selection_set)
+            if field.name.value in ROOT_FIELDS
+        ]
+        if not root_fields:
+            return None
+
+        query_type = self.schema.query_type
+        cost, depth = 0, 0
+        for field in root_fields:
+            field_cost, field_depth = self.field_cost(field, query_type, 1)
+            cost += field_cost
+            depth = max(depth, field_depth)
+        return cost, depth
+
+    def collect_fields(self, selection_set, type_name=None, visited=frozenset()):
+        """
+        Returns the fields of a selection set, with fragments expanded, as (field,
+        type name) tuples; the type name is that of the enclosing type condition, if any.
+        """
+        fields = []
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                fields.append((selection, type_name))
+            elif isinstance(selection, InlineFragmentNode):
+                condition = selection.type_condition.name.value if selection.type_condition else type_name
+                fields.extend(self.collect_fields(selection.selection_set, condition, visited))
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                if name in self.fragments and name not in visited:
+                    fragment = self.fragments[name]
+                    fields.extend(self.collect_fields(
+                        fragment.selection_set, fragment.type_condition.name.value, visited | {name}
+                    ))
+        return fields
+
+    def field_cost(self, field, parent_type, depth):
+        name = field.name.value
+        field_definition = getattr(parent_type, 'fields', {}).get(name)
+        if field_definition is None or name.startswith('__'):
+            return 0, depth
+
+        field_type = get_named_type(field_definition.type)
+        weight = self.weights.get(f'{parent_type.name}.{name}', 1 if is_composite_type(field_type) else 0)
+
+        cost, max_depth = weight, depth
+        if field.selection_set:
+            for subfield, type_name in self.collect_fields(field.selection_set):
+                # Fields of a union or interface are selected on one of its member types
+                subfield_type = self.schema.get_type(type_name) if type_name else field_type
+                subfield_cost, subfield_depth = self.field_cost(subfield, subfield_type, depth + 1)
+                cost += subfield_cost
+                max_depth = max(max_depth, subfield_depth)
+
+        if is_list_type(get_nullable_type(field_definition.type)):
+            cost *= self.list_size(field)
+        return cost, max_depth
+
+    def list_size(self, field):
+        """
+        Returns the pagination limit of a list field, or the default list size if
+        it sets none.
+
+        Raises:
+            UnboundedListError: If the limit is negative or null, which disables it.
+        """
+        for argument in field.arguments:
+            if argument.name.value != 'pagination':
+                continue
+            pagination = argument.value
+            if isinstance(pagination, VariableNode):
+                pagination = self.variables.get(pagination.name.value) or {}
+                if 'limit' not in pagination:
+                    continue
+                limit = pagination['limit']
+            elif isinstance(pagination, ObjectValueNode):
+                limit = next((item.value for item in pagination.fields if item.name.value == 'limit'), None)
+                if limit is None:
+                    continue
+                if isinstance(limit, VariableNode):
+                    if limit.name.value not in self.variables:
+                        continue
+                    limit = self.variables[limit.name.value]
+                elif isinstance(limit, NullValueNode):
+                    limit = None
+                elif isinstance(limit, IntValueNode):
+                    limit = int(limit.value)
+            else:
+                continue
+            if limit is None or (isinstance(limit, int) and limit < 0):
+                raise UnboundedListError(f"{field.name.value} is not paginated (negative or null limit)")
+            if isinstance(limit, int):
+                return limit
+        return self.default_list_size
+
+
+def estimate_cost(query, variables=None, operation_name=None):
+    """
+    Returns the (cost, depth) of a GraphQL query against NetBox's schema (see
+    QueryCost), or None if it does not select the plugin's root fields.
+
+    Raises:
+        GraphQLError: If the query cannot be parsed.
+        UnboundedListError: If a list field of the plugin lifts its pagination limit.
+    """
+    from netbox.graphql.schema import schema
+
+    analyzer = QueryCost(
+        schema._schema,
+        weights=get_plugin_config('netbox_license', 'graphql_field_weights'),
+        default_list_size=get_plugin_config('netbox_license', 'graphql_default_list_size'),
+        variables=variables,
+    )
+    return analyzer.analyze(parse(query), operation_name)
+
+
+def _json(value):
+    return json.loads(value) if isinstance(value, str) and value else value
+
+
+def get_operations(request):
+    """
+    Returns the GraphQL operations of a request as (query, variables, operation name)
+    tuples, for every transport the GraphQL view accepts: query string parameters,
+    JSON bodies (single or batched), application/graphql bodies, and form-encoded or
+    multipart (file upload) posts.
+
+    Raises:
+        ValueError: If the request cannot be decoded.
+    """
+    if request.method == 'GET':
+        payloads = [request.GET]
+    elif request.content_type == 'application/json':
+        payloads = json.loads(request.body)
+    elif request.content_type == 'application/graphql':
+        payloads = [{'query': request.body.decode()}]
+    elif request.content_type == 'multipart/form-data' and 'operations' in request.POST:
+        payloads = json.loads(request.POST['operations'])
+    else:
+        payloads = [request.POST]
+
+    if not isinstance(payloads, list):
+        payloads = [payloads]
+    return [
+        (payload.get('query'), _json(payload.get('variables')), payload.get('operationName'))
+        for payload in payloads
+    ]
+
+
+class GraphQLCostMiddleware:
+    """
+    Rejects GraphQL queries on the plugin's schema whose estimated cost or depth
+    exceeds the graphql_max_cost/graphql_max_depth plugin settings before they are
+    executed, and adds the estimate to the "extensions" of the response. The costs of
+    batched operations add up.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # request.path includes the script prefix (SCRIPT_NAME), as reverse() does
+        if request.path != reverse('graphql'):
+            return self.get_response(request)
+
+        max_cost = get_plugin_config('netbox_license', 'graphql_max_cost')
+        max_depth = get_plugin_config('netbox_license', 'graphql_max_depth')
+        cost, depth, analyzed = 0, 0, False
+        try:
+            for query, variables, operation_name in get_operations(request):
+                if not query:
+                    continue
+                result = estimate_cost(query, variables, operation_name)
+                if result is not None:
+                    cost, depth, analyzed = cost + result[0], max(depth, result[1]), True
+        except UnboundedListError as e:
+            if max_cost is None:
+                return self.get_response(request)
+            extension = {'cost': None, 'max_cost': max_cost, 'depth': None, 'max_depth': max_depth}
+            return self.reject(f"Query rejected: {e}.", extension)
+        except (ValueError, TypeError, KeyError, AttributeError, GraphQLError):
+            # Requests which cannot be decoded or parsed are rejected by the GraphQL view
+            return self.get_response(request)
+        if not analyzed:
+            return self.get_response(request)
+
+        extension = {'cost': cost, 'max_cost': max_cost, 'depth': depth, 'max_depth': max_depth}
+        if (max_cost is not None and cost > max_cost) or (max_depth is not None and depth > max_depth):
+            return self.reject(
+                f"Query rejected: estimated cost {cost} (maximum {max_cost}), depth {depth} (maximum {max_depth}).",
+                extension,
+            )
+
+        response = self.get_response(request)
+        if response.get('Content-Type', '').startswith('application/json') and not response.streaming:
+            try:
+                content = json.loads(response.content)
+            except ValueError:
+                return response
+            if isinstance(content, dict):
+                content.setdefault('extensions', {})['cost'] = extension
+                response.content = json.dumps(content)
+                if response.has_header('Content-Length'):
+                    response['Content-Length'] = len(response.content)
+        return response
+
+    @staticmethod
+    def reject(message, extension):
+        return JsonResponse({
+            'data': None,
+            'errors': [{
+                'message': message,
+                'extensions': {'code': 'QUERY_TOO_COMPLEX', **extension},
+            }],
+            'extensions': {'cost': extension},
+        }, status=400)
@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+from django.db import migrations, models
+
+
+THRESHOLDS = ((0, 'expired'), (30, 'critical'), (90, 'warning'))
+
+
+def populate_next_status_change(apps, schema_editor):
+    """
+    Bring status and next_status_change in line, so that the daily status job only
+    needs to look at licenses whose next status change is due.
+    """
+    License = apps.get_model('netbox_license', 'License')
+    today = date.today()
+
+    licenses = []
+    for license in License.objects.filter(expiry_date__isnull=False).only('pk', 'expiry_date', 'status').iterator():
+        delta = (license.expiry_date - today).days
+        license.status = next((status for days, status in THRESHOLDS if delta < days), 'good')
+        upcoming = [license.expiry_date - timedelta(days=days - 1) for days, status in THRESHOLDS]
+        license.next_status_change = min((day for day in upcoming if day > today), default=None)
+        licenses.append(license)
+
+    License.objects.bulk_update(licenses, ['status', 'next_status_change'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_license', '0004_rename_assigned_to_licenseassignment_assigned_on'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='license',
+            name='next_status_change',
+            field=models.DateField(blank=True, db_index=True, editable=False, help_text='Date on which the status of this license changes next.', null=True),
+        ),
+        migrations.RunPython(populate_next_status_change, migrations.RunPython.noop),
+    ]
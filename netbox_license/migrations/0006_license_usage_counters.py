@@ -0,0 +1,35 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_usage_counters(apps, schema_editor):
+    License = apps.get_model('netbox_license', 'License')
+    LicenseAssignment = apps.get_model('netbox_license', 'LicenseAssignment')
+
+    assignments = LicenseAssignment.objects.filter(license=OuterRef('pk')).order_by().values('license')
+    License.objects.update(
+        assigned_volume=Coalesce(Subquery(assignments.annotate(total=Sum('volume')).values('total')), 0),
+        assignment_count=Coalesce(Subquery(assignments.annotate(total=Count('pk')).values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_license', '0005_license_next_status_change'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='license',
+            name='assigned_volume',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Total volume of all assignments of this license.'),
+        ),
+        migrations.AddField(
+            model_name='license',
+            name='assignment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of assignments of this license.'),
+        ),
+        migrations.RunPython(populate_usage_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_license', '0006_license_usage_counters'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='license',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('license_key'), name='gin_trgm_ops'), name='netbox_lic_key_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='license',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('serial_number'), name='gin_trgm_ops'), name='netbox_lic_serial_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='license',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('description'), name='gin_trgm_ops'), name='netbox_lic_descr_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='licensetype',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='netbox_lictype_name_trgm'),
+        ),
+    ]
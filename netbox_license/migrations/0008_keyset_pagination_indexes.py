@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_license', '0007_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='license',
+            index=models.Index(fields=['last_updated', 'id'], name='netbox_lic_updated_id'),
+        ),
+        migrations.AddIndex(
+            model_name='licenseassignment',
+            index=models.Index(fields=['last_updated', 'id'], name='netbox_licassign_updated_id'),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_license', '0008_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='licensetype',
+            index=models.Index(fields=['last_updated', 'id'], name='netbox_lictype_updated_id'),
+        ),
+    ]
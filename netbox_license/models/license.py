@@ -1,15 +1,252 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import models, transaction
+from django.db.models import (
+    BooleanField, Case, Count, DateField, Exists, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, ExtractDay, Greatest, Upper
 from netbox.models import NetBoxModel
 from django.urls import reverse
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
-from datetime import date
+from datetime import date, timedelta
 from django.utils import timezone
 from netbox_license.models.licensetype import LicenseType
 from taggit.managers import TaggableManager
+from utilities.querysets import RestrictedQuerySet
 from ..choices import AssignmentKindChoices
+from .licenseassignment import LicenseAssignment
+from .mixins import LoadedStateMixin
 
-class License(NetBoxModel):
+# Denormalized usage counters, maintained with F() updates (see signals.py)
+USAGE_COUNTER_FIELDS = ("assigned_volume", "assignment_count")
+
+# Expiry status thresholds: a license gets the status of the first entry whose
+# number of days is larger than the days left until its expiry date.
+EXPIRY_STATUS_THRESHOLDS = (
+    (0, "expired"),
+    (30, "critical"),
+    (90, "warning"),
+)
+
+
+class LicenseQuerySet(RestrictedQuerySet):
+
+    # The expressions behind the with_*() annotations, also used by the GraphQL types
+
+    @staticmethod
+    def usage_annotations():
+        return {
+            "assigned_count_value": F("assigned_volume"),
+            "remaining_volume_value": Case(
+                When(license_type__volume_type="unlimited", then=Value(None)),
+                default=F("volume_limit") - F("assigned_volume"),
+                output_field=IntegerField(),
+            ),
+        }
+
+    @staticmethod
+    def expiry_annotations(today=None):
+        today = today or timezone.now().date()
+        return {
+            "days_to_expiry_value": ExtractDay(F("expiry_date") - Value(today, output_field=DateField())),
+        }
+
+    @staticmethod
+    def hierarchy_annotations():
+        return {
+            "is_parent_license_value": Exists(License.objects.filter(parent_license=OuterRef("pk"))),
+            "is_child_license_value": ExpressionWrapper(
+                Q(parent_license__isnull=False), output_field=BooleanField()
+            ),
+        }
+
+    @staticmethod
+    def kind_annotations():
+        return {
+            "has_device_assignments": Exists(
+                LicenseAssignment.objects.filter(license=OuterRef("pk"), device__isnull=False)
+            ),
+            "has_vm_assignments": Exists(
+                LicenseAssignment.objects.filter(license=OuterRef("pk"), virtual_machine__isnull=False)
+            ),
+        }
+
+    def with_usage(self):
+        """
+        Annotates the usage figures of each license (assigned_count_value,
+        remaining_volume_value).
+        """
+        return self.annotate(**self.usage_annotations())
+
+    def with_expiry(self, today=None):
+        """
+        Annotates the number of days left until the expiry date of each license
+        (days_to_expiry_value); negative once expired, None without an expiry date.
+        """
+        return self.annotate(**self.expiry_annotations(today))
+
+    def with_hierarchy(self):
+        """
+        Annotates whether each license is a parent (is_parent_license_value) or a
+        child (is_child_license_value) license.
+        """
+        return self.annotate(**self.hierarchy_annotations())
+
+    def with_kinds(self):
+        """
+        Annotates whether each license is assigned to devices (has_device_assignments)
+        and/or virtual machines (has_vm_assignments).
+        """
+        return self.annotate(**self.kind_annotations())
+
+    def status_buckets(self, today=None):
+        """
+        Returns a list of (status, Q, next_change) tuples which bucket expiry_date
+        against today, mirroring License.compute_status() in SQL. next_change is an
+        expression for the date the licenses in the bucket move to the next status,
+        or None if the status is final.
+        """
+        today = today or timezone.now().date()
+        buckets = [("unknown", Q(expiry_date__isnull=True), None)]
+        lower = None
+        next_change = None
+
+        for days, status in EXPIRY_STATUS_THRESHOLDS:
+            upper = today + timedelta(days=days)
+            condition = Q(expiry_date__lt=upper)
+            if lower is not None:
+                condition &= Q(expiry_date__gte=lower)
+            buckets.append((status, condition, next_change))
+            lower = upper
+            next_change = Cast(
+                F("expiry_date") - timedelta(days=days - 1),
+                output_field=models.DateField()
+            )
+
+        buckets.append(("good", Q(expiry_date__gte=lower), next_change))
+        return buckets
+
+    def refresh_status(self, today=None):
+        """
+        Recomputes the status of every license in the queryset without loading them.
+
+        Issues one UPDATE per status bucket, touching only rows whose stored status
+        differs. Returns a dict mapping the pk of every changed license to an
+        (old_status, new_status) tuple.
+        """
+        changed = {}
+        now = timezone.now()
+
+        with transaction.atomic(using=self.db):
+            for status, condition, next_change in self.status_buckets(today):
+                stale = self.filter(condition).exclude(status=status)
+                rows = list(stale.select_for_update().values_list("pk", "status"))
+                if not rows:
+                    continue
+                self.model.objects.filter(pk__in=[pk for pk, old_status in rows]).update(
+                    status=status, next_status_change=next_change, last_updated=now
+                )
+                changed.update({pk: (old_status, status) for pk, old_status in rows})
+
+        return changed
+
+    def rebuild_status_changes(self, today=None):
+        """
+        Recomputes next_status_change for every license in the queryset, e.g. after
+        restoring a backup. Returns the number of corrected rows.
+        """
+        count = 0
+
+        for status, condition, next_change in self.status_buckets(today):
+            wrong = self._next_status_change_mismatch(next_change)
+            count += self.filter(condition).filter(wrong).update(next_status_change=next_change)
+
+        return count
+
+    @staticmethod
+    def _next_status_change_mismatch(next_change):
+        if next_change is None:
+            return Q(next_status_change__isnull=False)
+        return ~Q(next_status_change=next_change) | Q(next_status_change__isnull=True)
+
+    def stale_status(self, today=None):
+        """
+        Returns the licenses whose stored status or next_status_change differs from
+        the value computed for today.
+        """
+        stale = Q()
+        for status, condition, next_change in self.status_buckets(today):
+            stale |= condition & (~Q(status=status) | self._next_status_change_mismatch(next_change))
+        return self.filter(stale)
+
+    def adjust_usage(self, volume=0, count=0):
+        """
+        Atomically shifts the usage counters of the licenses in the queryset by the
+        given assigned volume and number of assignments.
+        """
+        return self.update(
+            assigned_volume=F("assigned_volume") + volume,
+            assignment_count=F("assignment_count") + count,
+            last_updated=timezone.now(),
+        )
+
+    def _actual_usage(self):
+        assignments = LicenseAssignment.objects.filter(license=OuterRef("pk")).order_by().values("license")
+        volume = Coalesce(Subquery(assignments.annotate(total=Sum("volume")).values("total")), 0)
+        count = Coalesce(Subquery(assignments.annotate(total=Count("pk")).values("total")), 0)
+        return volume, count
+
+    def stale_usage(self):
+        """
+        Returns the licenses whose usage counters do not match their assignments,
+        annotated with the actual values (actual_volume, actual_count).
+        """
+        volume, count = self._actual_usage()
+        return self.annotate(actual_volume=volume, actual_count=count).exclude(
+            assigned_volume=F("actual_volume"), assignment_count=F("actual_count")
+        )
+
+    def rebuild_usage(self):
+        """
+        Recomputes the usage counters of the licenses in the queryset from their
+        assignments. Returns the number of corrected rows.
+        """
+        volume, count = self._actual_usage()
+        return self.model.objects.filter(pk__in=self.stale_usage().values("pk")).update(
+            assigned_volume=volume, assignment_count=count
+        )
+
+    def search(self, value):
+        """
+        Filters the licenses matching `value` (case-insensitive substring) in their key,
+        serial number, description or license type/manufacturer name. The substring
+        matches are served by the trigram indexes on these fields.
+        """
+        license_types = LicenseType.objects.filter(
+            Q(name__icontains=value) | Q(manufacturer__name__icontains=value)
+        )
+        return self.filter(
+            Q(license_key__icontains=value)
+            | Q(serial_number__icontains=value)
+            | Q(description__icontains=value)
+            | Q(license_type__in=license_types)
+        )
+
+    def with_search_rank(self, value):
+        """
+        Annotates the trigram similarity of each license to `value` (search_rank).
+        """
+        return self.annotate(
+            search_rank=Greatest(
+                TrigramSimilarity("license_key", value),
+                TrigramSimilarity("serial_number", value),
+                TrigramSimilarity("description", value),
+            )
+        )
+
+
+class License(LoadedStateMixin, NetBoxModel):
     license_key = models.CharField(max_length=255, unique=True)
     serial_number = models.CharField(max_length=255, blank=True, null=True)
     description = models.CharField(max_length=255, blank=True, null=True)
@@ -34,9 +271,29 @@ class License(NetBoxModel):
         help_text="Link to parent license for extensions."
     )
     status = models.CharField(max_length=20, default="unknown")
+    next_status_change = models.DateField(
+        null=True, blank=True,
+        editable=False,
+        db_index=True,
+        help_text="Date on which the status of this license changes next."
+    )
+    assigned_volume = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Total volume of all assignments of this license."
+    )
+    assignment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of assignments of this license."
+    )
 
     tags = TaggableManager(related_name="lm_license_tags")
 
+    objects = LicenseQuerySet.as_manager()
+
+    tracked_fields = ("status", "license_type_id")
+
     def clean(self):
         if self.license_type_id:
             try:
@@ -45,12 +302,10 @@ class License(NetBoxModel):
             except LicenseType.DoesNotExist:
                 pass
 
-        if self.pk:
-            original = License.objects.get(pk=self.pk)
-            if original.license_type != self.license_type:
-                raise ValidationError({
-                    "license_type": "Changing the license type of an existing license is not allowed."
-                })
+        if self.pk and self.has_changed("license_type_id"):
+            raise ValidationError({
+                "license_type": "Changing the license type of an existing license is not allowed."
+            })
 
         vt = self.license_type.volume_type if self.license_type_id and self.license_type else None
 
@@ -72,9 +327,37 @@ class License(NetBoxModel):
             
         self.status = self.compute_status()
 
+    def save(self, *args, **kwargs):
+        self.status = self.compute_status()
+        self.next_status_change = self.compute_next_status_change()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "status", "next_status_change"}
+        elif not self._state.adding:
+            # The usage counters may have moved since this instance was loaded
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in USAGE_COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def current_usage(self):
-        assigned = self.assignments.aggregate(models.Sum('volume'))['volume__sum'] or 0
-        return assigned
+        return self.assigned_volume
+
+    @property
+    def remaining_volume(self):
+        if "remaining_volume_value" in self.__dict__:
+            return self.remaining_volume_value
+        if self.license_type.volume_type == "unlimited" or self.volume_limit is None:
+            return None
+        return self.volume_limit - self.assigned_volume
+
+    @property
+    def days_to_expiry(self):
+        if "days_to_expiry_value" in self.__dict__:
+            return self.days_to_expiry_value
+        if not self.expiry_date:
+            return None
+        return (self.expiry_date - timezone.now().date()).days
 
     def usage_display(self):
         vt = self.license_type.volume_type if self.license_type else ""
@@ -87,28 +370,47 @@ class License(NetBoxModel):
             return "unknown"
 
         delta = (self.expiry_date - timezone.now().date()).days
-        if delta < 0:
-            return "expired"
-        elif delta < 30:
-            return "critical"
-        elif delta < 90:
-            return "warning"
+        for days, status in EXPIRY_STATUS_THRESHOLDS:
+            if delta < days:
+                return status
         return "good"
+
+    def compute_next_status_change(self, today=None):
+        if not self.expiry_date:
+            return None
+
+        today = today or timezone.now().date()
+        upcoming = [
+            self.expiry_date - timedelta(days=days - 1)
+            for days, status in EXPIRY_STATUS_THRESHOLDS
+        ]
+        return min((day for day in upcoming if day > today), default=None)
         
 
+    # The properties below use the annotations of LicenseQuerySet when present
+
     @property
     def is_parent_license(self):
+        if "is_parent_license_value" in self.__dict__:
+            return self.is_parent_license_value
         return self.sub_licenses.exists()
 
     @property
     def is_child_license(self):
-        return self.parent_license is not None
+        return self.parent_license_id is not None
     
 
 
     @property
     def usage_kinds(self):
-        kinds = set(a.kind for a in self.assignments.all())
+        if "has_device_assignments" in self.__dict__:
+            kinds = set()
+            if self.has_device_assignments:
+                kinds.add(AssignmentKindChoices.DEVICE)
+            if self.has_vm_assignments:
+                kinds.add(AssignmentKindChoices.VM)
+        else:
+            kinds = set(a.kind for a in self.assignments.all())
         return [dict(AssignmentKindChoices).get(k) for k in kinds if k]
 
     def __str__(self):
@@ -189,4 +491,12 @@ class License(NetBoxModel):
     
     class Meta:
         verbose_name = "Licenses"
-        verbose_name_plural = "Licenses"
\ No newline at end of file
+        verbose_name_plural = "Licenses"
+        indexes = [
+            # Trigram indexes backing the case-insensitive substring search (see LicenseQuerySet.search)
+            GinIndex(OpClass(Upper("license_key"), name="gin_trgm_ops"), name="netbox_lic_key_trgm"),
+            GinIndex(OpClass(Upper("serial_number"), name="gin_trgm_ops"), name="netbox_lic_serial_trgm"),
+            GinIndex(OpClass(Upper("description"), name="gin_trgm_ops"), name="netbox_lic_descr_trgm"),
+            # Keyset pagination in last_updated order (see api.pagination)
+            models.Index(fields=["last_updated", "id"], name="netbox_lic_updated_id"),
+        ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from netbox.models import NetBoxModel
 from dcim.models import Device
 from virtualization.models import VirtualMachine
@@ -7,9 +7,11 @@ from django.urls import reverse
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from taggit.managers import TaggableManager
+from utilities.exceptions import AbortRequest
 from ..choices import AssignmentKindChoices
+from .mixins import LoadedStateMixin
 
-class LicenseAssignment(NetBoxModel):
+class LicenseAssignment(LoadedStateMixin, NetBoxModel):
 
     license = models.ForeignKey(
         "License", on_delete=models.CASCADE, related_name="assignments",
@@ -35,6 +37,8 @@ class LicenseAssignment(NetBoxModel):
 
     tags = TaggableManager(related_name="lm_assignment_tags")
 
+    tracked_fields = ("license_id", "volume", "device_id", "virtual_machine_id")
+
     @property
     def kind(self):
         if self.device_id:
@@ -50,6 +54,15 @@ class LicenseAssignment(NetBoxModel):
     def assigned_object(self):
         return self.device or self.virtual_machine
 
+    def counted_usage(self, license):
+        """
+        Returns the (volume, count) this assignment already contributes to the usage
+        counters of the given license.
+        """
+        if self.pk and self.get_loaded_value("license_id") == license.pk:
+            return self.get_loaded_value("volume"), 1
+        return 0, 0
+
     def clean(self):
         if self.device and self.virtual_machine:
             raise ValidationError("A license can only be assigned to either a Device or a Virtual Machine, not both.")
@@ -57,31 +70,72 @@ class LicenseAssignment(NetBoxModel):
             raise ValidationError("You must assign the license to either a Device or a Virtual Machine.")
 
         if self.license:
-            if not self.license.license_type:
-                raise ValidationError("Selected license must be linked to a license type.")
-
-            volume_type = self.license.license_type.volume_type
-
-            if volume_type == "single":
-                if self.volume != 1:
-                    raise ValidationError("Single licenses can only have a volume of 1.")
-                existing_assignments = self.license.assignments.exclude(pk=self.pk).count()
-                if existing_assignments >= 1:
-                    raise ValidationError("Single licenses can only be assigned to one entity (Device or VM).")
-
-            elif volume_type == "volume":
-                if self.volume < 1:
-                    raise ValidationError("Volume quantity must be at least 1.")
-                total_assigned_volume = (
-                    self.license.assignments.exclude(pk=self.pk)
-                    .aggregate(models.Sum('volume'))['volume__sum'] or 0
+            self.check_capacity(self.license)
+
+    def check_capacity(self, license):
+        """
+        Verifies that the given license can take this assignment, based on its usage
+        counters. Raises ValidationError otherwise.
+        """
+        if not license.license_type:
+            raise ValidationError("Selected license must be linked to a license type.")
+
+        volume_type = license.license_type.volume_type
+        counted_volume, counted_count = self.counted_usage(license)
+
+        if volume_type == "single":
+            if self.volume != 1:
+                raise ValidationError("Single licenses can only have a volume of 1.")
+            existing_assignments = license.assignment_count - counted_count
+            if existing_assignments >= 1:
+                raise ValidationError("Single licenses can only be assigned to one entity (Device or VM).")
+
+        elif volume_type == "volume":
+            if self.volume < 1:
+                raise ValidationError("Volume quantity must be at least 1.")
+            total_assigned_volume = license.assigned_volume - counted_volume
+            if total_assigned_volume + self.volume > license.volume_limit:
+                raise ValidationError(
+                    f"Exceeds volume limit ({license.volume_limit}). Currently assigned: {total_assigned_volume}."
                 )
-                if total_assigned_volume + self.volume > self.license.volume_limit:
-                    raise ValidationError(
-                        f"Exceeds volume limit ({self.license.volume_limit}). Currently assigned: {total_assigned_volume}."
-                    )
 
-        
+    def reserve_capacity(self):
+        """
+        Locks the License rows whose usage this save changes (the target license and,
+        when the assignment moves, the license it leaves) and re-checks the capacity of
+        the target, so that concurrent writers cannot over-allocate it. The rows are
+        locked in primary key order, so opposite moves (A to B and B to A) cannot
+        deadlock. Only writers touching the same licenses wait for each other. Must be
+        called inside a transaction.
+        """
+        License = self._meta.get_field("license").related_model
+        license_ids = {self.license_id}
+        if self.pk and not self._state.adding:
+            license_ids.add(self.get_loaded_value("license_id"))
+        license_ids.discard(None)
+        licenses = {
+            license.pk: license
+            for license in License.objects.select_for_update(of=("self",))
+            .select_related("license_type")
+            .filter(pk__in=license_ids)
+            .order_by("pk")
+        }
+        if self.license_id is None:
+            return
+        if self.license_id not in licenses:
+            raise AbortRequest(f"License {self.license_id} does not exist.")
+        try:
+            self.check_capacity(licenses[self.license_id])
+        except ValidationError as e:
+            raise AbortRequest(" ".join(e.messages))
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            if self.has_changed("license_id") or self.has_changed("volume"):
+                self.reserve_capacity()
+            # The usage counters are updated by the post_save signal, still under the lock
+            super().save(*args, **kwargs)
+
     clone_fields = [
         'license', 'device', 'virtual_machine', 'description',
     ]
@@ -108,4 +162,8 @@ class LicenseAssignment(NetBoxModel):
                 check=~(models.Q(device__isnull=False) & models.Q(virtual_machine__isnull=False)),
                 name='licenseassign_only_one_target_allowed'
             )
+        ]
+        indexes = [
+            # Keyset pagination in last_updated order (see api.pagination)
+            models.Index(fields=['last_updated', 'id'], name='netbox_licassign_updated_id'),
         ]
\ No newline at end of file
@@ -1,15 +1,19 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from netbox.models import NetBoxModel
 from django.urls import reverse
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
+from .mixins import LoadedStateMixin
 from ..choices import (
     VolumeTypeChoices,
     PurchaseModelChoices,
     LicenseModelChoices,
     VolumeRelationChoices,
 )
-class LicenseType(NetBoxModel):
+
+class LicenseType(LoadedStateMixin, NetBoxModel):
     name = models.CharField(max_length=255)
 
     slug = models.SlugField(unique=True)
@@ -61,6 +65,8 @@ class LicenseType(NetBoxModel):
 
     clone_fields = ['manufacturer', 'volume_type', 'license_model', 'purchase_model']
 
+    tracked_fields = ('license_model', 'volume_type')
+
     def clean(self):
         super().clean()
 
@@ -81,16 +87,16 @@ class LicenseType(NetBoxModel):
                 })
 
         if self.pk:
-            original = LicenseType.objects.get(pk=self.pk)
-            has_licenses = self.licenses.exists()
+            model_changed = self.has_changed('license_model')
+            volume_type_changed = self.has_changed('volume_type')
 
-            if has_licenses:
-                if original.license_model != self.license_model:
+            if (model_changed or volume_type_changed) and self.licenses.exists():
+                if model_changed:
                     raise ValidationError({
                         "license_model": "Cannot change license model: there are existing licenses linked to this license type."
                     })
 
-                if original.volume_type != self.volume_type:
+                if volume_type_changed:
                     raise ValidationError({
                         "volume_type": "Cannot change volume type: there are existing licenses linked to this license type."
                     })
@@ -103,4 +109,10 @@ class LicenseType(NetBoxModel):
     
     class Meta:
         verbose_name = "License Type"
-        verbose_name_plural = "License Types"
\ No newline at end of file
+        verbose_name_plural = "License Types"
+        indexes = [
+            # Backs the license type name match of LicenseQuerySet.search()
+            GinIndex(OpClass(Upper("name"), name="gin_trgm_ops"), name="netbox_lictype_name_trgm"),
+            # Change feed in last_updated order (see api.views.ChangeFeedMixin)
+            models.Index(fields=["last_updated", "id"], name="netbox_lictype_updated_id"),
+        ]
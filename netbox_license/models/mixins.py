@@ -0,0 +1,47 @@
+__all__ = (
+    'LoadedStateMixin',
+)
+
+
+class LoadedStateMixin:
+    """
+    Records the database values of the fields listed in `tracked_fields` when an
+    instance is loaded, so that changes can be detected without re-fetching the row.
+    Fields are referenced by their attribute name (e.g. "license_type_id").
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.tracked_fields
+        }
+        return instance
+
+    def get_loaded_value(self, field):
+        """
+        Returns the value of a tracked field as it was loaded from the database. Falls
+        back to a query if the field was deferred when the instance was loaded.
+        """
+        loaded_values = self.__dict__.setdefault('_loaded_values', {})
+        if field not in loaded_values and self.pk is not None:
+            loaded_values[field] = (
+                type(self)._base_manager.filter(pk=self.pk).values_list(field, flat=True).first()
+            )
+        return loaded_values.get(field)
+
+    def has_changed(self, field):
+        """
+        Returns True if the tracked field differs from its loaded value. Always True
+        for objects which have not been saved yet.
+        """
+        if self._state.adding or self.pk is None:
+            return True
+        return self.get_loaded_value(field) != getattr(self, field)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Signal receivers still see the previous values; reset only once saved.
+        self._loaded_values = {field: getattr(self, field) for field in self.tracked_fields}
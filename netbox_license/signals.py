@@ -1,11 +1,10 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 import logging
 
-from netbox.context import current_request, events_queue
-from extras.events import enqueue_event
-
-from netbox_license.models import License
+from netbox_license.events import EXPIRY_STATUS_EVENT, enqueue_expiry_event
+from netbox_license.models import License, LicenseAssignment
+from netbox_license.utils.panels import invalidate_assignment_summaries
 
 ### This Signal is needed to trigger the Custom Event type.
 ### -> The Event type will be triggerd every time the Status field is updated from a License
@@ -19,20 +18,64 @@ def track_status_change(sender, instance, **kwargs):
     if not instance.pk:
         return  # Skip new objects
 
-    try:
-        old_instance = License.objects.get(pk=instance.pk)
-    except License.DoesNotExist:
+    # Compared against the value loaded with the instance; no extra query needed
+    if instance.has_changed('status'):
+        logger.info(f"Status changed: {instance.get_loaded_value('status')} -> {instance.status}")
+
+        if not enqueue_expiry_event(instance):
+            logger.warning("No request or event batch available; event not enqueued.")
+            return
+
+        logger.info(f"Event enqueued: {EXPIRY_STATUS_EVENT}")
+
+
+### These Signals keep the usage counters (assigned_volume, assignment_count) of a License in sync.
+### -> Code paths which bypass save()/delete() (bulk_create, queryset updates) must call adjust_usage() themselves
+
+@receiver(post_save, sender=LicenseAssignment)
+def update_license_usage(sender, instance, created, raw=False, **kwargs):
+    if raw:
         return
 
-    if old_instance.status != instance.status:
-        logger.info(f"Status changed: {old_instance.status} -> {instance.status}")
+    if created:
+        License.objects.filter(pk=instance.license_id).adjust_usage(instance.volume, 1)
+        return
 
-        request = current_request.get()
-        if request is None:
-            logger.warning("No request context available; event not enqueued.")
-            return
+    old_license_id = instance.get_loaded_value('license_id')
+    old_volume = instance.get_loaded_value('volume')
 
-        queue = events_queue.get()
-        enqueue_event(queue, instance, request.user, request.id, 'netbox_license.expirystatus')
-        events_queue.set(queue)
-        logger.info("Event enqueued: netbox_license.expirystatus")
+    if old_license_id != instance.license_id:
+        License.objects.filter(pk=old_license_id).adjust_usage(-old_volume, -1)
+        License.objects.filter(pk=instance.license_id).adjust_usage(instance.volume, 1)
+    elif old_volume != instance.volume or _kind_changed(instance):
+        # Also touched when only the kind changes, which shows in the usage kinds of the
+        # license (API ETags rely on last_updated)
+        License.objects.filter(pk=instance.license_id).adjust_usage(instance.volume - old_volume)
+
+
+def _kind_changed(assignment):
+    return (
+        (assignment.get_loaded_value('device_id') is None) != (assignment.device_id is None)
+        or (assignment.get_loaded_value('virtual_machine_id') is None) != (assignment.virtual_machine_id is None)
+    )
+
+
+@receiver(post_delete, sender=LicenseAssignment)
+def release_license_usage(sender, instance, **kwargs):
+    # Also fires for assignments removed by a cascade (e.g. deleting a Device or VM)
+    License.objects.filter(pk=instance.license_id).adjust_usage(-instance.volume, -1)
+
+
+### Cached license panels of Devices, VMs and Clusters (see get_assignment_summary())
+
+@receiver(post_save, sender=LicenseAssignment)
+@receiver(post_delete, sender=LicenseAssignment)
+def invalidate_license_panels(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    device_ids, virtual_machine_ids = {instance.device_id}, {instance.virtual_machine_id}
+    if not kwargs.get('created'):
+        # Includes the objects the assignment was moved away from
+        device_ids.add(instance.get_loaded_value('device_id'))
+        virtual_machine_ids.add(instance.get_loaded_value('virtual_machine_id'))
+    invalidate_assignment_summaries(device_ids, virtual_machine_ids)
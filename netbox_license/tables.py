@@ -1,14 +1,40 @@
 from django.db.models import Sum
 from django_tables2 import tables, TemplateColumn
+from django_tables2.data import TableQuerysetData
 from netbox.tables import NetBoxTable
 from django.urls import reverse
 from django.utils.html import format_html
 from .models import License, LicenseAssignment, LicenseType
 from .template_content import LICENSE_EXPIRY_PROGRESSBAR_TABLE
 
+class SelectRelatedTableMixin:
+    """
+    Joins the relations read by the visible columns (following the user's column
+    configuration) into the table's queryset with select_related(), so rows never
+    look up related objects one by one. `related_columns` maps each column to the
+    relations it reads, including those used by its render method.
+
+    NetBoxTable already prefetch_related()s the relations named by the accessors of
+    the visible columns; joining them here takes precedence (prefetching skips
+    relations that are already cached) and also covers the relations read by render
+    methods and nested accessors, which that prefetch does not follow.
+    """
+    related_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if isinstance(self.data, TableQuerysetData):
+            relations = {
+                relation
+                for column in self.columns if column.visible
+                for relation in self.related_columns.get(column.name, ())
+            }
+            if relations:
+                self.data.data = self.data.data.select_related(*sorted(relations))
+
 # ---------- LicenseType ----------
 
-class LicenseTypeTable(NetBoxTable):
+class LicenseTypeTable(SelectRelatedTableMixin, NetBoxTable):
     name = tables.Column(linkify=True)
     slug = tables.Column()
     manufacturer = tables.Column(verbose_name="Manufacturer", linkify=True)
@@ -37,6 +63,11 @@ class LicenseTypeTable(NetBoxTable):
     purchase_model = tables.Column(verbose_name="Purchase Model")
     description = tables.Column()
 
+    related_columns = {
+        "manufacturer": ("manufacturer",),
+        "base_license": ("base_license",),
+    }
+
     class Meta(NetBoxTable.Meta):
         model = LicenseType
         fields = (
@@ -53,7 +84,7 @@ class LicenseTypeTable(NetBoxTable):
 
 # ---------- License ----------
 
-class LicenseTable(NetBoxTable):
+class LicenseTable(SelectRelatedTableMixin, NetBoxTable):
     license_type = tables.Column(
         accessor="license_type.name",
         linkify=lambda record: record.license_type.get_absolute_url(),
@@ -127,6 +158,17 @@ class LicenseTable(NetBoxTable):
         order_by="expiry_date",
     )
 
+    related_columns = {
+        "license_type": ("license_type",),
+        "license_model": ("license_type",),
+        "product_key": ("license_type",),
+        "manufacturer": ("license_type__manufacturer",),
+        "parent_license": ("parent_license",),
+        "parent_license_type": ("parent_license__license_type",),
+        "volume_type": ("license_type",),
+        "volume_relation": ("license_type",),
+        "assigned_count": ("license_type",),
+    }
     
     def render_volume_type(self, record):
         return getattr(record.license_type, 'get_volume_type_display', lambda: '—')()
@@ -169,7 +211,7 @@ class LicenseTable(NetBoxTable):
 
 # ---------- Assignments ----------
 
-class LicenseAssignmentTable(NetBoxTable):
+class LicenseAssignmentTable(SelectRelatedTableMixin, NetBoxTable):
     
     license_key = tables.Column(
         accessor="license",
@@ -218,6 +260,18 @@ class LicenseAssignmentTable(NetBoxTable):
     assigned_on = tables.Column(verbose_name="Assigned On")
     description = tables.Column(verbose_name="Description")
 
+    # Unnamed devices are displayed by their device type
+    related_columns = {
+        "license_key": ("license",),
+        "license_type": ("license__license_type",),
+        "manufacturer": ("license__license_type__manufacturer",),
+        "device": ("device__device_type__manufacturer",),
+        "device_type": ("device__device_type__manufacturer",),
+        "device_manufacturer": ("device__device_type__manufacturer",),
+        "virtual_machine": ("virtual_machine",),
+        "volume_relation": ("license__license_type",),
+    }
+
     class Meta(NetBoxTable.Meta):
         model = LicenseAssignment
         fields = (
@@ -42,82 +42,59 @@ class LicenseProgressBarInjector(PluginTemplateExtension):
         })
 
 
-class DeviceLicenseExtension(PluginTemplateExtension):
-    model = "dcim.device"
+class AssignedLicensesExtension(PluginTemplateExtension):
+    """
+    Base class for the Assigned Licenses panel of the objects licenses are assigned to.
+    The panel shows a summary of the assignments (see get_assignment_summary()).
+    """
+    object_model = None
+    # The LicenseAssignment field referencing the object
+    assignment_field = None
+    template_name = None
 
     def left_page(self):
-        object = self.context.get("object")
-        if not isinstance(object, apps.get_model("dcim", "Device")):
-            return ""
-
-        LicenseAssignment = apps.get_model("netbox_license", "LicenseAssignment")
-        license_assignments = LicenseAssignment.objects.filter(device=object)
-
-        context = {
-            "licenses": license_assignments,
-            "object": object,
-            "related_object_counts": ((
-                "Assigned Licenses",
-                "plugins:netbox_license:licenseassignment_list",
-                "device_id",
-                object.pk,
-                license_assignments.count()
-            ),)
-        }
-
-        return self.render("netbox_license/inc/device_info.html", extra_context=context)
-
-
-class VirtualMachineLicenseExtension(PluginTemplateExtension):
-    model = "virtualization.virtualmachine"
+        from .utils.panels import get_assignment_summary
 
-    def left_page(self):
         object = self.context.get("object")
-        if not isinstance(object, apps.get_model("virtualization", "VirtualMachine")):
+        if not isinstance(object, apps.get_model(self.object_model)):
             return ""
 
-        LicenseAssignment = apps.get_model("netbox_license", "LicenseAssignment")
-        license_assignments = LicenseAssignment.objects.filter(virtual_machine=object)
+        summary = get_assignment_summary(self.assignment_field, object.pk)
 
         context = {
-            "licenses": license_assignments,
+            "summary": summary,
             "object": object,
             "related_object_counts": ((
                 "Assigned Licenses",
                 "plugins:netbox_license:licenseassignment_list",
-                "virtual_machine_id",
+                f"{self.assignment_field}_id",
                 object.pk,
-                license_assignments.count()
+                summary["count"]
             ),)
         }
 
-        return self.render("netbox_license/inc/virtual_machines_info.html", extra_context=context)
+        return self.render(self.template_name, extra_context=context)
 
 
-class ClustersLicenseExtension(PluginTemplateExtension):
-    model = "virtualization.cluster"
+class DeviceLicenseExtension(AssignedLicensesExtension):
+    model = "dcim.device"
+    object_model = "dcim.Device"
+    assignment_field = "device"
+    template_name = "netbox_license/inc/device_info.html"
 
-    def left_page(self):
-        object = self.context.get("object")
-        if not isinstance(object, apps.get_model("virtualization", "Cluster")):
-            return ""
 
-        LicenseAssignment = apps.get_model("netbox_license", "LicenseAssignment")
-        license_assignments = LicenseAssignment.objects.filter(virtual_machine__cluster=object)
+class VirtualMachineLicenseExtension(AssignedLicensesExtension):
+    model = "virtualization.virtualmachine"
+    object_model = "virtualization.VirtualMachine"
+    assignment_field = "virtual_machine"
+    template_name = "netbox_license/inc/virtual_machines_info.html"
 
-        context = {
-            "licenses": license_assignments,
-            "object": object,
-            "related_object_counts": ((
-                "Assigned Licenses",
-                "plugins:netbox_license:licenseassignment_list",
-                "virtual_machine__cluster_id",
-                object.pk,
-                license_assignments.count()
-            ),)
-        }
 
-        return self.render("netbox_license/inc/clusters_info.html", extra_context=context)
+class ClustersLicenseExtension(AssignedLicensesExtension):
+    model = "virtualization.cluster"
+    object_model = "virtualization.Cluster"
+    assignment_field = "virtual_machine__cluster"
+    template_name = "netbox_license/inc/clusters_info.html"
 
 
 class LicenseTypeExtension(PluginTemplateExtension):
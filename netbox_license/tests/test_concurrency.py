@@ -0,0 +1,80 @@
+import threading
+
+from django.db import close_old_connections, connection
+from django.test import TransactionTestCase
+from utilities.exceptions import AbortRequest
+
+from netbox_license.models import License, LicenseAssignment
+from .utils import create_devices, create_license, create_license_type
+
+
+class AssignmentConcurrencyTestCase(TransactionTestCase):
+    """
+    Runs concurrent assignment writes in separate threads (each with its own database
+    connection) and checks that the capacity checks and usage counters hold up.
+    """
+
+    def run_concurrently(self, *functions):
+        barrier = threading.Barrier(len(functions))
+        errors = []
+
+        def run(function):
+            try:
+                barrier.wait()
+                function()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(function,)) for function in functions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        self.assertFalse(any(thread.is_alive() for thread in threads), "Writers did not finish (deadlock?)")
+        close_old_connections()
+        return errors
+
+    def test_concurrent_allocations_respect_capacity(self):
+        license = create_license(create_license_type(), 'LIC-1', volume_limit=5)
+        devices = create_devices(20)
+
+        def assign(device):
+            return lambda: LicenseAssignment(license_id=license.pk, device=device, volume=1).save()
+
+        errors = self.run_concurrently(*(assign(device) for device in devices))
+
+        license.refresh_from_db()
+        self.assertEqual(LicenseAssignment.objects.filter(license=license).count(), 5)
+        self.assertEqual(license.assigned_volume, 5)
+        self.assertEqual(license.assignment_count, 5)
+        self.assertEqual(len(errors), 15)
+        self.assertTrue(all(isinstance(e, AbortRequest) for e in errors))
+
+    def test_opposite_moves_do_not_deadlock(self):
+        license_type = create_license_type()
+        license_a = create_license(license_type, 'LIC-A', volume_limit=100)
+        license_b = create_license(license_type, 'LIC-B', volume_limit=100)
+        device_a, device_b = create_devices(2)
+        for _ in range(10):
+            assignment_a = LicenseAssignment.objects.create(license=license_a, device=device_a, volume=1)
+            assignment_b = LicenseAssignment.objects.create(license=license_b, device=device_b, volume=1)
+
+            def move(pk, license_id):
+                def run():
+                    assignment = LicenseAssignment.objects.get(pk=pk)
+                    assignment.license_id = license_id
+                    assignment.save()
+                return run
+
+            errors = self.run_concurrently(
+                move(assignment_a.pk, license_b.pk),
+                move(assignment_b.pk, license_a.pk),
+            )
+            self.assertEqual(errors, [])
+
+        for license in License.objects.filter(pk__in=(license_a.pk, license_b.pk)):
+            assignments = LicenseAssignment.objects.filter(license=license)
+            self.assertEqual(license.assignment_count, assignments.count())
+            self.assertEqual(license.assigned_volume, sum(a.volume for a in assignments))
@@ -0,0 +1,128 @@
+from django.test import TestCase
+
+from netbox_license.filtersets.licenseassignments import LicenseAssignmentFilterSet
+from netbox_license.filtersets.licenses import LicenseFilterSet
+from netbox_license.models import License, LicenseAssignment
+from .utils import create_devices, create_license, create_license_type, create_virtual_machines
+
+
+class SemijoinFilterTestMixin:
+    """
+    Checks that a filter returns the expected objects with a single query whose SQL
+    has no DISTINCT and whose plan does not deduplicate rows.
+    """
+    filterset = None
+
+    def assertSemijoinFilter(self, params, expected):
+        queryset = self.filterset(params, self.queryset).qs
+        sql = str(queryset.query).upper()
+        self.assertNotIn('DISTINCT', sql)
+        self.assertTrue('EXISTS' in sql or ' IN (SELECT' in sql, sql)
+        self.assertNotIn('Unique', queryset.explain())
+        with self.assertNumQueries(1):
+            self.assertEqual({obj.pk for obj in queryset}, {obj.pk for obj in expected})
+
+
+class LicenseFilterSetTestCase(SemijoinFilterTestMixin, TestCase):
+    filterset = LicenseFilterSet
+
+    @classmethod
+    def setUpTestData(cls):
+        base = create_license_type(slug='base')
+        cls.expansion_type = create_license_type(slug='expansion', license_model='expansion', base_license=base)
+        cls.parent = create_license(base, 'PARENT')
+        cls.children = [
+            create_license(cls.expansion_type, f'CHILD-{i}', parent_license=cls.parent) for i in range(2)
+        ]
+        cls.unassigned = create_license(base, 'UNASSIGNED')
+        cls.devices = create_devices(2)
+        cls.virtual_machines = create_virtual_machines(2)
+        # Several assignments per license, so that joins would duplicate rows
+        for device in cls.devices:
+            LicenseAssignment.objects.create(license=cls.parent, device=device)
+        for virtual_machine in cls.virtual_machines:
+            LicenseAssignment.objects.create(license=cls.children[0], virtual_machine=virtual_machine)
+
+    @property
+    def queryset(self):
+        return License.objects.all()
+
+    def test_no_params(self):
+        queryset = self.filterset({}, self.queryset).qs
+        with self.assertNumQueries(1):
+            self.assertEqual(len(queryset), License.objects.count())
+
+    def test_is_parent_license(self):
+        self.assertSemijoinFilter({'is_parent_license': True}, [self.parent])
+        self.assertSemijoinFilter(
+            {'is_parent_license': False}, [*self.children, self.unassigned]
+        )
+
+    def test_child_license(self):
+        self.assertSemijoinFilter({'child_license': [self.children[0].pk]}, [self.parent])
+
+    def test_is_assigned(self):
+        self.assertSemijoinFilter({'is_assigned': True}, [self.parent, self.children[0]])
+        self.assertSemijoinFilter({'is_assigned': False}, [self.children[1], self.unassigned])
+
+    def test_assignments_device(self):
+        self.assertSemijoinFilter(
+            {'assignments__device_id': [device.pk for device in self.devices]}, [self.parent]
+        )
+        self.assertSemijoinFilter(
+            {'assignments__device_id__n': [device.pk for device in self.devices]}, [*self.children, self.unassigned]
+        )
+
+    def test_assignments_virtual_machine(self):
+        self.assertSemijoinFilter(
+            {'assignments__virtual_machine_id': [self.virtual_machines[0].pk]}, [self.children[0]]
+        )
+        self.assertSemijoinFilter(
+            {'assignments__virtual_machine_id__n': [self.virtual_machines[0].pk]},
+            [self.parent, self.children[1], self.unassigned]
+        )
+
+    def test_assignments_cluster(self):
+        self.assertSemijoinFilter(
+            {'assignments__virtual_machine__cluster_id': [self.virtual_machines[0].cluster_id]},
+            [self.children[0]]
+        )
+        self.assertSemijoinFilter(
+            {'assignments__virtual_machine__cluster_id__n': [self.virtual_machines[0].cluster_id]},
+            [self.parent, self.children[1], self.unassigned]
+        )
+
+    def test_base_license_type(self):
+        self.assertSemijoinFilter(
+            {'base_license_type_id': self.expansion_type.pk}, [self.parent, self.unassigned]
+        )
+
+    def test_search(self):
+        self.assertSemijoinFilter({'q': 'CHILD'}, self.children)
+
+
+class LicenseAssignmentFilterSetTestCase(SemijoinFilterTestMixin, TestCase):
+    filterset = LicenseAssignmentFilterSet
+
+    @classmethod
+    def setUpTestData(cls):
+        license_type = create_license_type()
+        cls.license = create_license(license_type, 'LICENSE-ONE')
+        other = create_license(license_type, 'OTHER')
+        cls.device = create_devices(1)[0]
+        cls.virtual_machine = create_virtual_machines(1)[0]
+        cls.device_assignment = LicenseAssignment.objects.create(license=cls.license, device=cls.device)
+        cls.vm_assignment = LicenseAssignment.objects.create(license=other, virtual_machine=cls.virtual_machine)
+
+    @property
+    def queryset(self):
+        return LicenseAssignment.objects.all()
+
+    def test_search_license(self):
+        self.assertSemijoinFilter({'q': 'LICENSE-ONE'}, [self.device_assignment])
+
+    def test_search_device(self):
+        self.assertSemijoinFilter({'q': self.device.name}, [self.device_assignment])
+
+    def test_search_virtual_machine(self):
+        self.assertSemijoinFilter({'q': self.virtual_machine.name}, [self.vm_assignment])
@@ -0,0 +1,225 @@
+import json
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from utilities.testing import APITestCase
+
+from netbox_license.middleware import UnboundedListError, estimate_cost
+from netbox_license.models import LicenseAssignment
+from .utils import create_devices, create_license, create_license_type, create_virtual_machines
+
+ASSIGNMENT_QUERY = """
+{
+  license_assignment_list {
+    id
+    volume
+    device { id name }
+    virtual_machine { id name }
+    license {
+      license_key
+      is_parent_license
+      is_child_license
+      usage_kinds
+      remaining_volume
+      days_to_expiry
+      license_type { name manufacturer { name } }
+      parent_license { license_key }
+    }
+  }
+}
+"""
+
+
+class GraphQLQueryCountTestCase(APITestCase):
+    """
+    The number of queries of a GraphQL query must not grow with the number of objects.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_superuser = True
+        self.user.save()
+        self.license_type = create_license_type()
+        self.parent = create_license(self.license_type, 'PARENT', volume_limit=1000)
+
+    def create_assignments(self, count, offset):
+        devices = create_devices(count, prefix=f'device-{offset}')
+        virtual_machines = create_virtual_machines(count, prefix=f'vm-{offset}')
+        for i in range(count):
+            license = create_license(
+                self.license_type, f'LICENSE-{offset}-{i}', volume_limit=10, parent_license=self.parent
+            )
+            LicenseAssignment.objects.create(license=license, device=devices[i])
+            LicenseAssignment.objects.create(license=license, virtual_machine=virtual_machines[i])
+
+    def count_queries(self, query):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('graphql'), data=json.dumps({'query': query}), content_type='application/json',
+                **self.header
+            )
+        self.assertHttpStatus(response, 200)
+        self.assertNotIn('errors', response.json())
+        return len(queries)
+
+    def test_nested_assignments(self):
+        self.create_assignments(3, offset=0)
+        few = self.count_queries(ASSIGNMENT_QUERY)
+        self.create_assignments(20, offset=1)
+        many = self.count_queries(ASSIGNMENT_QUERY)
+        self.assertEqual(few, many)
+
+
+@override_settings(PLUGINS_CONFIG={'netbox_license': {
+    'graphql_max_cost': 10,
+    'graphql_max_depth': 10,
+    'graphql_default_list_size': 100,
+    'graphql_field_weights': {},
+}})
+class GraphQLCostTransportTestCase(APITestCase):
+    """
+    The cost limits must apply to every request transport the GraphQL view accepts.
+    """
+    query = '{ license_list { id license_type { name } } }'
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_superuser = True
+        self.user.save()
+
+    def assertRejected(self, response):
+        self.assertHttpStatus(response, 400)
+        self.assertEqual(response.json()['errors'][0]['extensions']['code'], 'QUERY_TOO_COMPLEX')
+
+    def test_get(self):
+        response = self.client.get(reverse('graphql'), {'query': self.query}, **self.header)
+        self.assertRejected(response)
+
+    def test_json(self):
+        response = self.client.post(
+            reverse('graphql'), data=json.dumps({'query': self.query}), content_type='application/json',
+            **self.header
+        )
+        self.assertRejected(response)
+
+    def test_json_batch(self):
+        query = '{ license_list(pagination: {limit: 3}) { id license_type { name } } }'
+        response = self.client.post(
+            reverse('graphql'), data=json.dumps([{'query': query}] * 2), content_type='application/json',
+            **self.header
+        )
+        self.assertRejected(response)
+
+    def test_graphql_body(self):
+        response = self.client.post(
+            reverse('graphql'), data=self.query, content_type='application/graphql', **self.header
+        )
+        self.assertRejected(response)
+
+    def test_form(self):
+        response = self.client.post(
+            reverse('graphql'), data=urlencode({'query': self.query}),
+            content_type='application/x-www-form-urlencoded', **self.header
+        )
+        self.assertRejected(response)
+
+    def test_multipart(self):
+        response = self.client.post(
+            reverse('graphql'), data={'operations': json.dumps({'query': self.query}), 'map': '{}'},
+            **self.header
+        )
+        self.assertRejected(response)
+
+COST_QUERY = '{ license_list(pagination: {limit: 5}) { id license_type { name manufacturer { name } } } }'
+COST_SETTINGS = {
+    'graphql_max_cost': 50,
+    'graphql_max_depth': 10,
+    'graphql_default_list_size': 100,
+    'graphql_field_weights': {},
+}
+
+
+@override_settings(PLUGINS_CONFIG={'netbox_license': COST_SETTINGS})
+class GraphQLCostTestCase(APITestCase):
+    """
+    The estimated cost and depth of queries, and their report in the response.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_superuser = True
+        self.user.save()
+
+    def post(self, query, variables=None):
+        return self.client.post(
+            reverse('graphql'), data=json.dumps({'query': query, 'variables': variables}),
+            content_type='application/json', **self.header
+        )
+
+    def test_cost_and_depth(self):
+        # (license + license_type + manufacturer) * 5; license_list > license_type > manufacturer > name
+        self.assertEqual(estimate_cost(COST_QUERY), (15, 4))
+
+    def test_default_list_size(self):
+        self.assertEqual(estimate_cost('{ license_type_list { id } }'), (100, 2))
+
+    def test_variables(self):
+        query = 'query ($limit: Int) { license_list(pagination: {limit: $limit}) { id license_type { name } } }'
+        self.assertEqual(estimate_cost(query, {'limit': 3}), (6, 3))
+        query = 'query ($pagination: OffsetPaginationInput) { license_list(pagination: $pagination) { id } }'
+        self.assertEqual(estimate_cost(query, {'pagination': {'limit': 7}}), (7, 2))
+        self.assertEqual(estimate_cost(query, {'pagination': {'offset': 7}}), (100, 2))
+
+    def test_fragments(self):
+        query = '{ ...Licenses } fragment Licenses on Query { license_list(pagination: {limit: 5}) { id } }'
+        self.assertEqual(estimate_cost(query), (5, 2))
+
+    def test_weights(self):
+        settings = {**COST_SETTINGS, 'graphql_field_weights': {'LicenseType.license_type': 4}}
+        with override_settings(PLUGINS_CONFIG={'netbox_license': settings}):
+            self.assertEqual(estimate_cost(COST_QUERY), (30, 4))
+
+    def test_other_root_fields(self):
+        self.assertIsNone(estimate_cost('{ site_list { id } }'))
+
+    def test_unbounded_lists(self):
+        for query, variables in (
+            ('{ license_list(pagination: {limit: -1}) { id } }', None),
+            ('{ license_list(pagination: {limit: null}) { id } }', None),
+            ('query ($limit: Int) { license_list(pagination: {limit: $limit}) { id } }', {'limit': None}),
+            (
+                'query ($pagination: OffsetPaginationInput) { license_list(pagination: $pagination) { id } }',
+                {'pagination': {'limit': -1}},
+            ),
+        ):
+            with self.subTest(query=query, variables=variables):
+                with self.assertRaises(UnboundedListError):
+                    estimate_cost(query, variables)
+
+    def test_extensions(self):
+        response = self.post(COST_QUERY)
+        self.assertHttpStatus(response, 200)
+        self.assertEqual(
+            response.json()['extensions']['cost'], {'cost': 15, 'max_cost': 50, 'depth': 4, 'max_depth': 10}
+        )
+
+    def test_rejected_cost(self):
+        response = self.post('{ license_list { id license_type { name } } }')
+        self.assertHttpStatus(response, 400)
+        error = response.json()['errors'][0]
+        self.assertEqual(error['extensions']['code'], 'QUERY_TOO_COMPLEX')
+        self.assertEqual(error['extensions']['cost'], 200)
+        self.assertEqual(response.json()['extensions']['cost']['depth'], 3)
+
+    def test_rejected_unbounded_list(self):
+        query = (
+            '{ license_assignment_list(pagination: {limit: -1}) '
+            '{ license { license_type { manufacturer { name } } } } }'
+        )
+        response = self.post(query)
+        self.assertHttpStatus(response, 400)
+        self.assertEqual(response.json()['errors'][0]['extensions']['code'], 'QUERY_TOO_COMPLEX')
+        self.assertIsNone(response.json()['extensions']['cost']['cost'])
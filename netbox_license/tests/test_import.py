@@ -0,0 +1,49 @@
+from django.urls import reverse
+from utilities.choices import CSVDelimiterChoices, ImportFormatChoices
+from utilities.testing import TestCase
+
+from netbox_license.models import LicenseAssignment
+from .utils import create_devices, create_license, create_license_type
+
+
+class LicenseAssignmentImportTestCase(TestCase):
+    """
+    Records of an import are validated against the usage left by the previous ones.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_superuser = True
+        self.user.save()
+        license_type = create_license_type()
+        self.full = create_license(license_type, 'FULL', volume_limit=1)
+        self.other = create_license(license_type, 'OTHER', volume_limit=5)
+        self.devices = create_devices(2)
+        self.assignment = LicenseAssignment.objects.create(license=self.full, device=self.devices[0])
+
+    def import_csv(self, csv_data):
+        return self.client.post(reverse('plugins:netbox_license:licenseassignment_bulk_import'), {
+            'data': '\n'.join(csv_data),
+            'format': ImportFormatChoices.CSV,
+            'csv_delimiter': CSVDelimiterChoices.AUTO,
+        })
+
+    def test_move_frees_previous_license(self):
+        response = self.import_csv([
+            'id,license,model_kind,model_name,volume',
+            f'{self.assignment.pk},OTHER,device,{self.devices[0].name},1',
+            f',FULL,device,{self.devices[1].name},1',
+        ])
+        self.assertHttpStatus(response, 302)
+        self.assignment.refresh_from_db()
+        self.assertEqual(self.assignment.license, self.other)
+        self.assertTrue(LicenseAssignment.objects.filter(license=self.full, device=self.devices[1]).exists())
+
+    def test_capacity_exceeded(self):
+        response = self.import_csv([
+            'license,model_kind,model_name,volume',
+            f'OTHER,device,{self.devices[1].name},1',
+            f'FULL,device,{self.devices[1].name},1',
+        ])
+        self.assertHttpStatus(response, 200)
+        self.assertEqual(LicenseAssignment.objects.count(), 1)
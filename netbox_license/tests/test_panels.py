@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from netbox_license.allocation import allocate_assignments
+from netbox_license.models import LicenseAssignment
+from netbox_license.utils.panels import get_assignment_summary
+from .utils import create_devices, create_license, create_license_type, create_virtual_machines
+
+
+@override_settings(PLUGINS_CONFIG={'netbox_license': {'panel_cache_timeout': 300}})
+class AssignmentSummaryCacheTestCase(TestCase):
+    """
+    Cached license panels must be invalidated by every write of assignments.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.license = create_license(create_license_type(), 'LICENSE', volume_limit=10)
+        cls.devices = create_devices(2)
+        cls.virtual_machines = create_virtual_machines(1)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_save_and_delete(self):
+        device = self.devices[0]
+        self.assertEqual(get_assignment_summary('device', device.pk)['count'], 0)
+        assignment = LicenseAssignment.objects.create(license=self.license, device=device)
+        self.assertEqual(get_assignment_summary('device', device.pk)['count'], 1)
+        assignment.delete()
+        self.assertEqual(get_assignment_summary('device', device.pk)['count'], 0)
+
+    def test_bulk_create(self):
+        device, virtual_machine = self.devices[1], self.virtual_machines[0]
+        self.assertEqual(get_assignment_summary('device', device.pk)['count'], 0)
+        self.assertEqual(get_assignment_summary('virtual_machine__cluster', virtual_machine.cluster_id)['count'], 0)
+
+        allocate_assignments([
+            {'license': self.license.pk, 'device': device.pk, 'volume': 2},
+            {'license': self.license.pk, 'virtual_machine': virtual_machine.pk},
+        ])
+
+        self.assertEqual(get_assignment_summary('device', device.pk)['volume'], 2)
+        self.assertEqual(get_assignment_summary('virtual_machine__cluster', virtual_machine.cluster_id)['count'], 1)
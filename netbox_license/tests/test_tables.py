@@ -0,0 +1,70 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from utilities.testing import TestCase
+
+from netbox_license.models import LicenseAssignment
+from netbox_license.tables import LicenseAssignmentTable, LicenseTable, LicenseTypeTable
+from .utils import create_devices, create_license, create_license_type, create_virtual_machines
+
+OBJECT_COUNT = 30
+
+
+class TableQueryCountTestCase(TestCase):
+    """
+    The number of queries of a list view must not grow with the page size, whichever
+    columns are visible.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        base = create_license_type(slug='base')
+        parent = create_license(base, 'PARENT', volume_limit=1000)
+        devices = create_devices(OBJECT_COUNT)
+        unnamed_devices = create_devices(OBJECT_COUNT, prefix='unnamed', named=False)
+        virtual_machines = create_virtual_machines(OBJECT_COUNT)
+        for i in range(OBJECT_COUNT):
+            license_type = create_license_type(
+                slug=f'expansion-{i}', license_model='expansion', base_license=base
+            )
+            license = create_license(license_type, f'LICENSE-{i}', parent_license=parent)
+            LicenseAssignment.objects.create(license=license, device=devices[i])
+            LicenseAssignment.objects.create(license=license, device=unnamed_devices[i])
+            LicenseAssignment.objects.create(license=license, virtual_machine=virtual_machines[i])
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_superuser = True
+        self.user.save()
+
+    def count_queries(self, url, per_page):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'per_page': per_page})
+        self.assertHttpStatus(response, 200)
+        return len(queries)
+
+    def assertFlatQueryCount(self, table, url):
+        column_configurations = {
+            'default': table.Meta.default_columns,
+            'all': table.Meta.fields,
+            'minimal': table.Meta.fields[:1],
+        }
+        for name, columns in column_configurations.items():
+            with self.subTest(columns=name):
+                self.user.config.set(f'tables.{table.__name__}.columns', list(columns), commit=True)
+                # Warm up caches (content types, user configuration, ...)
+                self.count_queries(url, 5)
+                few = self.count_queries(url, 5)
+                many = self.count_queries(url, OBJECT_COUNT)
+                self.assertEqual(few, many)
+
+    def test_license_types(self):
+        self.assertFlatQueryCount(LicenseTypeTable, reverse('plugins:netbox_license:licensetype_list'))
+
+    def test_licenses(self):
+        self.assertFlatQueryCount(LicenseTable, reverse('plugins:netbox_license:license_list'))
+
+    def test_license_assignments(self):
+        self.assertFlatQueryCount(
+            LicenseAssignmentTable, reverse('plugins:netbox_license:licenseassignment_list')
+        )
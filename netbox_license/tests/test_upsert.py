@@ -0,0 +1,36 @@
+from core.models import ObjectChange
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from netbox_license.models import License
+from netbox_license.upsert import upsert_licenses
+from .utils import create_license, create_license_type
+
+
+class UpsertLicensesTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.license_type = create_license_type()
+        for i in range(10):
+            create_license(cls.license_type, f'LICENSE-{i}')
+
+    def upsert(self, items):
+        with transaction.atomic():
+            return upsert_licenses(items)
+
+    def test_manufacturers_loaded_with_licenses(self):
+        # Items without a license type keep the one of the existing license, whose
+        # manufacturer License.clean() reads
+        items = [{'license_key': f'LICENSE-{i}', 'description': 'Updated'} for i in range(10)]
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.upsert(items)['updated'], 10)
+        self.assertFalse([query for query in queries if 'FROM "dcim_manufacturer"' in query['sql']])
+
+    def test_changelog_keeps_created(self):
+        license = License.objects.get(license_key='LICENSE-0')
+        self.upsert([{'license_key': 'LICENSE-0', 'serial_number': 'SERIAL'}])
+        change = ObjectChange.objects.get(changed_object_id=license.pk)
+        self.assertEqual(change.postchange_data['serial_number'], 'SERIAL')
+        self.assertEqual(change.postchange_data['created'], change.prechange_data['created'])
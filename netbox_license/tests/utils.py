@@ -0,0 +1,45 @@
+from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Site
+from virtualization.models import Cluster, ClusterType, VirtualMachine
+
+from netbox_license.models import License, LicenseType
+
+__all__ = (
+    'create_devices',
+    'create_license',
+    'create_license_type',
+    'create_virtual_machines',
+)
+
+
+def create_license_type(volume_type='volume', slug='license-type', **kwargs):
+    manufacturer, _ = Manufacturer.objects.get_or_create(name='Manufacturer', slug='manufacturer')
+    return LicenseType.objects.create(
+        name=slug, slug=slug, manufacturer=manufacturer, volume_type=volume_type, **kwargs
+    )
+
+
+def create_license(license_type, license_key, volume_limit=10, **kwargs):
+    return License.objects.create(
+        license_type=license_type, license_key=license_key, volume_limit=volume_limit, **kwargs
+    )
+
+
+def create_devices(count, prefix='device', named=True):
+    manufacturer, _ = Manufacturer.objects.get_or_create(name='Manufacturer', slug='manufacturer')
+    device_type, _ = DeviceType.objects.get_or_create(manufacturer=manufacturer, model='Model', slug='model')
+    role, _ = DeviceRole.objects.get_or_create(name='Role', slug='role')
+    site, _ = Site.objects.get_or_create(name='Site', slug='site')
+    return Device.objects.bulk_create([
+        Device(
+            name=f'{prefix}-{i}' if named else None, device_type=device_type, role=role, site=site
+        )
+        for i in range(count)
+    ])
+
+
+def create_virtual_machines(count, prefix='vm'):
+    cluster_type, _ = ClusterType.objects.get_or_create(name='Cluster Type', slug='cluster-type')
+    cluster, _ = Cluster.objects.get_or_create(name='Cluster', type=cluster_type)
+    return VirtualMachine.objects.bulk_create([
+        VirtualMachine(name=f'{prefix}-{i}', cluster=cluster) for i in range(count)
+    ])
@@ -0,0 +1,211 @@
+from core.choices import ObjectChangeActionChoices
+from django.core.exceptions import ValidationError
+from extras.models import CustomField
+from utilities.exceptions import PermissionsViolation
+
+from netbox_license.events import enqueue_expiry_event
+from netbox_license.models import License, LicenseType
+from netbox_license.utils.changelog import log_bulk_changes
+
+__all__ = (
+    'UPSERT_FIELDS',
+    'UpsertValidationError',
+    'upsert_licenses',
+)
+
+# The License fields an upsert may set, besides license_key
+UPSERT_FIELDS = (
+    'license_type',
+    'serial_number',
+    'description',
+    'comments',
+    'purchase_date',
+    'expiry_date',
+    'volume_limit',
+    'parent_license',
+)
+
+# Written on conflict (existing license_key); the usage counters are left alone
+CONFLICT_UPDATE_FIELDS = (*UPSERT_FIELDS, 'status', 'next_status_change', 'last_updated')
+
+
+class UpsertValidationError(Exception):
+    """
+    Raised by upsert_licenses() with the errors of each item (a list of dicts).
+    """
+    def __init__(self, errors):
+        super().__init__("Invalid licenses")
+        self.errors = errors
+
+
+def _resolve_license_types(items):
+    """
+    Resolves the license types referenced by ID or slug, with their manufacturers
+    (read by License.clean()), with one query.
+    """
+    references = {str(item['license_type']) for item in items if item.get('license_type') is not None}
+    ids = {int(reference) for reference in references if reference.isdigit()}
+    queryset = LicenseType.objects.filter(pk__in=ids) | LicenseType.objects.filter(slug__in=references)
+    license_types = {}
+    for license_type in queryset.select_related('manufacturer'):
+        license_types[str(license_type.pk)] = license_type
+        license_types[license_type.slug] = license_type
+    return license_types
+
+
+def _state(license):
+    return tuple(getattr(license, license._meta.get_field(field).attname) for field in UPSERT_FIELDS) + (
+        license.status,
+    )
+
+
+def upsert_licenses(items, user=None, request_id=None):
+    """
+    Creates or updates licenses keyed by their license_key, with INSERT ... ON CONFLICT
+    DO UPDATE. Fields missing from an item keep their current value. Licenses whose
+    values do not change are not written and get no changelog entry. Must be called
+    inside a transaction.
+
+    Args:
+        items (list): Dicts with a license_key and any of UPSERT_FIELDS. The license
+            type is referenced by ID or slug, the parent license by its license key
+            (which may be another item).
+        user (User): The user the changes are made by; its object permissions apply.
+        request_id (UUID): Groups the changelog entries.
+
+    Returns:
+        dict: The number of created, updated and unchanged licenses.
+
+    Raises:
+        UpsertValidationError: If any item is invalid; nothing is written.
+    """
+    keys = [item['license_key'] for item in items]
+    parent_keys = {item['parent_license'] for item in items if item.get('parent_license')}
+    existing = {
+        license.license_key: license
+        for license in License.objects.filter(license_key__in={*keys, *parent_keys})
+        .select_related('license_type__manufacturer')
+        .prefetch_related('tags')
+    }
+    license_types = _resolve_license_types(items)
+    custom_field_defaults = {cf.name: cf.default for cf in CustomField.objects.get_for_model(License)}
+
+    errors = [{} for item in items]
+    seen = set()
+    created, updated, unchanged = [], [], 0
+    pending_parents = {}
+
+    for index, item in enumerate(items):
+        key = item['license_key']
+        if key in seen:
+            errors[index]['license_key'] = [f"Duplicate license key '{key}' in the request."]
+            continue
+        seen.add(key)
+
+        license = existing.get(key)
+        if license is None:
+            license = License(license_key=key, custom_field_data=dict(custom_field_defaults))
+        else:
+            license.snapshot()
+        before = _state(license) if license.pk else None
+
+        for field in UPSERT_FIELDS:
+            if field not in item or field in ('license_type', 'parent_license'):
+                continue
+            setattr(license, field, item[field])
+
+        if 'license_type' in item:
+            license_type = license_types.get(str(item['license_type']))
+            if license_type is None:
+                errors[index]['license_type'] = [f"License type '{item['license_type']}' not found."]
+                continue
+            license.license_type = license_type
+        elif not license.pk:
+            errors[index]['license_type'] = ["This field is required."]
+            continue
+
+        if 'parent_license' in item:
+            parent_key = item['parent_license']
+            if not parent_key:
+                license.parent_license = None
+            elif parent_key in existing:
+                license.parent_license = existing[parent_key]
+            elif parent_key in keys:
+                # Created by this request; set once the parent has been written
+                pending_parents[key] = parent_key
+            else:
+                errors[index]['parent_license'] = [f"License '{parent_key}' not found."]
+                continue
+
+        try:
+            # The related objects have been resolved above; skip their per-object queries
+            license.full_clean(
+                exclude=['license_type', 'parent_license'], validate_unique=False, validate_constraints=False
+            )
+        except ValidationError as e:
+            errors[index].update(e.message_dict)
+            continue
+
+        license.status = license.compute_status()
+        license.next_status_change = license.compute_next_status_change()
+
+        if license.pk is None:
+            created.append(license)
+        elif key in pending_parents or _state(license) != before:
+            updated.append(license)
+        else:
+            unchanged += 1
+
+    if any(errors):
+        raise UpsertValidationError(errors)
+
+    # A license whose parent is created by this request is written after it, one
+    # INSERT per level of the hierarchy
+    written = {license.license_key: license for license in created + updated}
+    levels, remaining = [], dict(written)
+    while remaining:
+        level = [license for key, license in remaining.items() if pending_parents.get(key) not in remaining]
+        if not level:
+            errors = [{} for item in items]
+            for index, item in enumerate(items):
+                if item['license_key'] in remaining:
+                    errors[index]['parent_license'] = ["The parent licenses of the request form a cycle."]
+            raise UpsertValidationError(errors)
+        levels.append(level)
+        for license in level:
+            del remaining[license.license_key]
+
+    # bulk_create() stamps `created` on every instance (pre_save()), also on those
+    # updated on conflict whose row keeps its value; restored for the changelog
+    created_dates = {license.pk: license.created for license in updated}
+    for licenses in levels:
+        for license in licenses:
+            if license.license_key in pending_parents:
+                license.parent_license = written[pending_parents[license.license_key]]
+        License.objects.bulk_create(
+            licenses,
+            update_conflicts=True,
+            unique_fields=['license_key'],
+            update_fields=CONFLICT_UPDATE_FIELDS,
+        )
+
+    for license in updated:
+        license.created = created_dates[license.pk]
+
+    if user is not None:
+        for action, licenses in (('add', created), ('change', updated)):
+            pks = [license.pk for license in licenses]
+            if License.objects.restrict(user, action).filter(pk__in=pks).count() != len(pks):
+                raise PermissionsViolation()
+
+    log_bulk_changes(created, ObjectChangeActionChoices.ACTION_CREATE, user=user, request_id=request_id)
+    log_bulk_changes(updated, ObjectChangeActionChoices.ACTION_UPDATE, user=user, request_id=request_id)
+    for license in updated:
+        if license.has_changed('status'):
+            enqueue_expiry_event(license)
+
+    return {
+        'created': len(created),
+        'updated': len(updated),
+        'unchanged': unchanged,
+    }
@@ -0,0 +1,90 @@
+import uuid
+
+from core.choices import ObjectChangeActionChoices
+from core.events import OBJECT_CREATED, OBJECT_UPDATED
+from django.apps import apps
+from django.db.models import prefetch_related_objects
+from netbox.search.backends import search_backend
+from netbox_license.events import enqueue_object_event
+from netbox_license.utils.panels import invalidate_assignment_summaries
+
+# The object events sent for bulk-written objects (see log_bulk_changes())
+OBJECT_EVENT_TYPES = {
+    ObjectChangeActionChoices.ACTION_CREATE: OBJECT_CREATED,
+    ObjectChangeActionChoices.ACTION_UPDATE: OBJECT_UPDATED,
+}
+
+
+def record_changes(instances, action, user=None, request_id=None):
+    """
+    Writes the changelog entries for a batch of objects in a single INSERT.
+
+    Used by code paths which bypass save() (queryset updates, bulk_create) and
+    therefore never reach NetBox's change logging signal handlers.
+
+    Args:
+        instances (iterable): The changed objects. For updates, each object should
+            carry a pre-change snapshot (see ChangeLoggingMixin.snapshot()).
+        action (str): An ObjectChangeActionChoices value.
+        user (User): The user responsible for the change, if any.
+        request_id (UUID): Groups the entries; a new one is generated if omitted.
+
+    Returns:
+        list: The created ObjectChange instances.
+    """
+    ObjectChange = apps.get_model('core', 'ObjectChange')
+    request_id = request_id or uuid.uuid4()
+
+    changes = []
+    for instance in instances:
+        change = instance.to_objectchange(action)
+        change.user = user
+        change.user_name = user.username if user else ''
+        change.request_id = request_id
+        changes.append(change)
+
+    return ObjectChange.objects.bulk_create(changes)
+
+
+def log_bulk_changes(instances, action, user=None, request_id=None):
+    """
+    Does for objects written with bulk_create() or bulk_update() what NetBox's signal
+    handlers do for saved ones: writes the changelog, enqueues the object events (see
+    enqueue_object_event()), updates the search cache and, for license assignments,
+    invalidates the cached license panels of their objects.
+
+    Args:
+        instances (list): The created or updated objects. Updated objects should carry
+            a pre-change snapshot.
+        action (str): ObjectChangeActionChoices.ACTION_CREATE or ACTION_UPDATE.
+        user (User): The user responsible for the change, if any.
+        request_id (UUID): Groups the changelog entries.
+
+    Returns:
+        list: The created ObjectChange instances.
+    """
+    if not instances:
+        return []
+
+    prefetch_related_objects(instances, 'tags')
+    changes = record_changes(instances, action, user=user, request_id=request_id)
+    for instance in instances:
+        enqueue_object_event(instance, OBJECT_EVENT_TYPES[action])
+    search_backend.cache(instances, remove_existing=action != ObjectChangeActionChoices.ACTION_CREATE)
+    _invalidate_panels(instances, action)
+
+    return changes
+
+
+def _invalidate_panels(instances, action):
+    LicenseAssignment = apps.get_model('netbox_license', 'LicenseAssignment')
+    assignments = [instance for instance in instances if isinstance(instance, LicenseAssignment)]
+    if not assignments:
+        return
+    device_ids = {assignment.device_id for assignment in assignments}
+    virtual_machine_ids = {assignment.virtual_machine_id for assignment in assignments}
+    if action != ObjectChangeActionChoices.ACTION_CREATE:
+        # Includes the objects the assignments were moved away from
+        device_ids.update(assignment.get_loaded_value('device_id') for assignment in assignments)
+        virtual_machine_ids.update(assignment.get_loaded_value('virtual_machine_id') for assignment in assignments)
+    invalidate_assignment_summaries(device_ids, virtual_machine_ids)
@@ -0,0 +1,82 @@
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from netbox.plugins import get_plugin_config
+
+from netbox_license.models.license import EXPIRY_STATUS_THRESHOLDS
+
+__all__ = (
+    'PANEL_STATUSES',
+    'get_assignment_summary',
+    'invalidate_assignment_summaries',
+)
+
+# The license statuses broken down in the panels, most urgent first (see License.compute_status())
+PANEL_STATUSES = (*(status for days, status in EXPIRY_STATUS_THRESHOLDS), "good", "unknown")
+
+
+def _cache_key(field, pk):
+    return f"netbox_license:assignment_summary:{field}:{pk}"
+
+
+def get_assignment_summary(field, pk):
+    """
+    Returns the number of license assignments of an object, their total volume and
+    their number per license status, computed with a single aggregate query.
+
+    Results are cached for the panel_cache_timeout plugin setting (in seconds; 0
+    disables the cache). Saving or deleting an assignment, including in bulk (see
+    log_bulk_changes()), invalidates the summaries of its objects; license status
+    changes show up once the entry expires.
+
+    Args:
+        field (str): The assignment field referencing the object: "device",
+            "virtual_machine" or "virtual_machine__cluster".
+        pk (int): The primary key of the object.
+
+    Returns:
+        dict: The "count", the "volume" and the "statuses" ((status, count) tuples,
+            for statuses with assignments only).
+    """
+    timeout = get_plugin_config("netbox_license", "panel_cache_timeout")
+    if timeout:
+        summary = cache.get(_cache_key(field, pk))
+        if summary is not None:
+            return summary
+
+    LicenseAssignment = apps.get_model("netbox_license", "LicenseAssignment")
+    totals = LicenseAssignment.objects.filter(**{field: pk}).aggregate(
+        count=Count("pk"),
+        volume=Coalesce(Sum("volume"), 0),
+        **{status: Count("pk", filter=Q(license__status=status)) for status in PANEL_STATUSES},
+    )
+    summary = {
+        "count": totals["count"],
+        "volume": totals["volume"],
+        "statuses": [(status, totals[status]) for status in PANEL_STATUSES if totals[status]],
+    }
+
+    if timeout:
+        cache.set(_cache_key(field, pk), summary, timeout)
+    return summary
+
+
+def invalidate_assignment_summaries(device_ids=(), virtual_machine_ids=()):
+    """
+    Drops the cached summaries of the given devices and virtual machines, and of the
+    clusters of the virtual machines.
+    """
+    if not get_plugin_config("netbox_license", "panel_cache_timeout"):
+        return
+
+    device_ids = {pk for pk in device_ids if pk}
+    virtual_machine_ids = {pk for pk in virtual_machine_ids if pk}
+    keys = [_cache_key("device", pk) for pk in device_ids]
+    keys += [_cache_key("virtual_machine", pk) for pk in virtual_machine_ids]
+    if virtual_machine_ids:
+        VirtualMachine = apps.get_model("virtualization", "VirtualMachine")
+        cluster_ids = VirtualMachine.objects.filter(pk__in=virtual_machine_ids).values_list("cluster_id", flat=True)
+        keys += [_cache_key("virtual_machine__cluster", pk) for pk in set(cluster_ids) if pk]
+    if keys:
+        cache.delete_many(keys)
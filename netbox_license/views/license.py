@@ -1,15 +1,13 @@
 from netbox.views import generic
 from utilities.views import register_model_view
-from django.db.models import OuterRef, Subquery, Sum, Case, When, BooleanField, Value
-from django.db.models.functions import Coalesce
 from netbox_license.models.license import License
-from netbox_license.models.licenseassignment import LicenseAssignment
 from .. import tables
 from ..forms.filtersets import LicenseFilterForm
 from ..forms.bulk_edit import LicenseBulkEditForm
 from ..forms.bulk_import import LicenseImportForm
 from ..forms.models import LicenseForm
 from netbox_license.filtersets.licenses import LicenseFilterSet
+from .mixins import BulkImportLookupsMixin
 
 
 
@@ -28,7 +26,9 @@ __all__ = (
 @register_model_view(License)
 class LicenseView(generic.ObjectView):
     """View for displaying a single License"""
-    queryset = License.objects.all()
+    queryset = License.objects.with_usage().with_hierarchy().with_kinds().select_related(
+        'license_type__manufacturer', 'parent_license'
+    )
 
     def get_extra_context(self, request, instance):
         context = super().get_extra_context(request, instance)
@@ -37,35 +37,11 @@ class LicenseView(generic.ObjectView):
 @register_model_view(License, 'list', path='', detail=False)
 class LicenseListView(generic.ObjectListView):
     """View for displaying a list of Licenses"""
-    queryset = License.objects.all()
+    queryset = License.objects.with_usage().with_hierarchy()
     table = tables.LicenseTable
     filterset = LicenseFilterSet
     filterset_form = LicenseFilterForm
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-
-        assignments_sum = LicenseAssignment.objects.filter(
-            license=OuterRef('pk')
-        ).values('license').annotate(
-            total=Sum('volume')
-        ).values('total')
-
-        return qs.annotate(
-            is_parent_license_value=Case(
-                When(sub_licenses__isnull=False, then=Value(True)),
-                default=Value(False),
-                output_field=BooleanField()
-            ),
-            is_child_license_value=Case(
-                When(parent_license__isnull=False, then=Value(True)),
-                default=Value(False),
-                output_field=BooleanField()
-            ),
-            assigned_count_value=Coalesce(Subquery(assignments_sum), 0)
-        ).distinct()
-
-
 
 @register_model_view(License, 'edit')
 @register_model_view(License, 'add', detail=False)
@@ -97,7 +73,7 @@ class LicenseDeleteView(generic.ObjectDeleteView):
 # -------------------- bulk --------------------
 
 @register_model_view(License, 'bulk_import', path='import', detail=False)
-class LicenseBulkImportView(generic.BulkImportView):
+class LicenseBulkImportView(BulkImportLookupsMixin, generic.BulkImportView):
     """View for bulk importing licenses."""
     queryset = License.objects.all()
     model_form = LicenseImportForm
@@ -1,4 +1,7 @@
+from core.choices import ObjectChangeActionChoices
+from django.core.exceptions import ValidationError
 from netbox.views import generic
+from utilities.exceptions import AbortRequest
 from utilities.views import register_model_view
 from netbox_license.models.licenseassignment import LicenseAssignment
 from .. import tables
@@ -7,6 +10,10 @@ from ..forms.models import LicenseAssignmentForm
 from ..forms.bulk_edit import LicenseAssignmentBulkEditForm
 from ..forms.bulk_import import LicenseAssignmentImportForm
 from ..forms.filtersets import LicenseAssignmentFilterForm
+from ..forms.lookups import DUPLICATE
+from ..allocation import CapacityLedger
+from ..utils.changelog import log_bulk_changes
+from .mixins import BulkImportLookupsMixin
 
 
 __all__ = (
@@ -21,7 +28,10 @@ __all__ = (
 @register_model_view(LicenseAssignment)
 class LicenseAssignmentView(generic.ObjectView):
     """View to display details of a license assignment."""
-    queryset = LicenseAssignment.objects.prefetch_related("license", "device")
+    queryset = LicenseAssignment.objects.select_related(
+        "license__license_type__manufacturer", "license__parent_license",
+        "device__device_type__manufacturer", "virtual_machine",
+    )
 
     def get_extra_content(self, request, instance):
         context = super().get_extra_content(request, instance)
@@ -31,7 +41,8 @@ class LicenseAssignmentView(generic.ObjectView):
 @register_model_view(LicenseAssignment, 'list', path='', detail=False)
 class LicenseAssignmentListView(generic.ObjectListView):
     """View to list all assigned licenses with advanced filters."""
-    queryset = LicenseAssignment.objects.prefetch_related("license", "device")
+    # The joins follow the visible table columns (see SelectRelatedTableMixin)
+    queryset = LicenseAssignment.objects.all()
     table = tables.LicenseAssignmentTable
     filterset = LicenseAssignmentFilterSet
     filterset_form = LicenseAssignmentFilterForm 
@@ -55,10 +66,57 @@ class LicenseAssignmentDeleteView(generic.ObjectDeleteView):
 # -------------------- bulk --------------------
 
 @register_model_view(LicenseAssignment, 'bulk_import', path='import', detail=False)
-class LicenseAssignmentBulkImportView(generic.BulkImportView):
-    """View for bulk importing license assignments."""
+class LicenseAssignmentBulkImportView(BulkImportLookupsMixin, generic.BulkImportView):
+    """
+    View for bulk importing license assignments. When the import only creates
+    assignments, NetBox's record loop validates them as usual, but instead of being
+    saved one by one they are counted against one in-memory ledger of their licenses'
+    usage and inserted with a single statement once every record is valid. Imports
+    updating existing assignments are saved record by record.
+    """
     queryset = LicenseAssignment.objects.all()
     model_form = LicenseAssignmentImportForm
+    ledger = None
+
+    def get_import_lookups(self, records, request):
+        lookups = super().get_import_lookups(records, request)
+        if any(record.get('id') for record in records):
+            return lookups
+
+        # The records share the locked License objects of the ledger
+        licenses = lookups['license'][1]
+        self.ledger = CapacityLedger(obj.pk for obj in licenses.values() if obj is not DUPLICATE)
+        for key, obj in licenses.items():
+            if obj is not DUPLICATE:
+                licenses[key] = self.ledger.get(obj.pk)
+        return lookups
+
+    def save_object(self, object_form, request):
+        if self.ledger is None:
+            return super().save_object(object_form, request)
+
+        instance = object_form.instance
+        try:
+            self.ledger.allocate(instance)
+        except ValidationError as e:
+            raise AbortRequest(f"Record {len(self.allocated) + 1}: {' '.join(e.messages)}")
+        self.allocated.append((instance, object_form))
+        return instance
+
+    def create_and_update_objects(self, form, request):
+        self.ledger, self.allocated = None, []
+        objects = super().create_and_update_objects(form, request)
+        if self.ledger is None:
+            return objects
+
+        assignments = self.ledger.create([instance for instance, object_form in self.allocated])
+        for instance, object_form in self.allocated:
+            if object_form.cleaned_data.get('tags'):
+                object_form._save_m2m()
+        log_bulk_changes(
+            assignments, ObjectChangeActionChoices.ACTION_CREATE, user=request.user, request_id=request.id
+        )
+        return assignments
 
 @register_model_view(LicenseAssignment, 'bulk_edit', path='edit', detail=False)
 class LicenseAssignmentBulkEditView(generic.BulkEditView):
@@ -8,6 +8,7 @@ from ..forms.models import LicenseTypeForm
 from ..forms.bulk_edit import LicenseTypeBulkEditForm
 from ..forms.bulk_import import LicenseTypeImportForm
 from django.db.models import Count
+from .mixins import BulkImportLookupsMixin
 
 __all__ = (
     'LicenseTypeView',
@@ -50,7 +51,7 @@ class LicenseTypeDeleteView(generic.ObjectDeleteView):
 # -------------------- bulk --------------------
 
 @register_model_view(LicenseType, 'bulk_import', path='import', detail=False)
-class LicenseTypeBulkImportView(generic.BulkImportView):
+class LicenseTypeBulkImportView(BulkImportLookupsMixin, generic.BulkImportView):
     queryset = LicenseType.objects.all()
     model_form = LicenseTypeImportForm
 
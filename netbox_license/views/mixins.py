@@ -0,0 +1,24 @@
+from ..forms.lookups import import_lookups
+
+__all__ = (
+    'BulkImportLookupsMixin',
+)
+
+
+class BulkImportLookupsMixin:
+    """
+    Pre-resolves the objects referenced by all records of a bulk import (one query
+    per model) before the records are validated one by one. The model form must
+    use ImportLookupsMixin.
+    """
+
+    def get_import_lookups(self, records, request):
+        """
+        Returns the lookups shared by the model forms of all records.
+        """
+        return self.model_form.preload_lookups(records, user=request.user)
+
+    def create_and_update_objects(self, form, request):
+        records = form.cleaned_data['data']
+        with import_lookups(self.get_import_lookups(records, request)):
+            return super().create_and_update_objects(form, request)